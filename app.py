@@ -1,19 +1,302 @@
-from flask import Flask, render_template, request, jsonify, make_response
+from flask import Flask, render_template, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 import json
 import ijson
+from ijson.common import JSONError as IJSONError  # backend modules do not re-export it
+for _backend in ('yajl2_c', 'yajl2_cffi'):
+    try:
+        ijson = ijson.get_backend(_backend)
+        break
+    except ImportError:  # needs the compiled extension / cffi; keep the fastest backend ijson found
+        continue
+try:
+    import orjson
+except ImportError:  # optional accelerator; stdlib json is used when it is missing
+    orjson = None
 import gzip
+import zlib
+try:
+    from isal import igzip as gzip_impl
+except ImportError:  # optional accelerator (ISA-L inflate, ~2x stdlib); same GzipFile API
+    gzip_impl = gzip
+try:
+    import rapidgzip
+except ImportError:  # optional; inflates local .gz files on several cores
+    rapidgzip = None
 import requests
-from io import BytesIO, StringIO
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from io import StringIO
 import pandas as pd
+import numpy as np
 import openpyxl
 import csv
 import os
+import sys
 import hashlib
 import uuid
 import shutil
+import tempfile
 import time
+import threading
+import concurrent.futures
+import multiprocessing
 import math
+import gc
+import contextlib
+import functools
 import datetime
+import pickle
+import re
+import secrets
+import urllib.parse
+from collections import OrderedDict
+from itertools import chain, islice
+
+
+def json_loads(data):
+    """Parse JSON from bytes or str, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps_bytes(obj):
+    """Serialize to UTF-8 JSON bytes, using orjson (numpy- and non-str-key-aware) when it is installed."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+        except TypeError:
+            pass  # e.g. Decimal values from ijson; the stdlib path below stringifies them
+    return json.dumps(obj, ensure_ascii=False, default=str).encode('utf-8')
+
+
+def _fadvise(fd, advice_name):
+    """Best-effort os.posix_fadvise hint for the whole file; a no-op where unsupported (e.g. Windows)."""
+    advice = getattr(os, advice_name, None)
+    if advice is None or not hasattr(os, 'posix_fadvise'):
+        return
+    try:
+        os.posix_fadvise(fd, 0, 0, advice)
+    except OSError:
+        pass
+
+
+def usable_cpus():
+    """CPUs this process may use: its scheduler affinity mask, capped by any cgroup v2 CPU quota."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        cpus = os.cpu_count() or 1
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()[:2]
+        if quota != 'max':
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+
+def open_gzip_file(path):
+    """Binary reader over a local .gz file: rapidgzip (parallel) when installed, else isal/stdlib gzip."""
+    if rapidgzip is not None:
+        return rapidgzip.open(path, parallelization=usable_cpus())
+    handle = gzip_impl.open(path, 'rb')
+    _fadvise(handle.fileobj.fileno(), 'POSIX_FADV_SEQUENTIAL')
+    return handle
+
+
+def gzip_reader(fileobj):
+    """Decompressing reader over an already-open gzip stream (download, parts, sockets)."""
+    return gzip_impl.GzipFile(fileobj=fileobj)
+
+
+def iter_in_network_items(stream):
+    """Yield each in_network entry of an MRF stream as a dict, with numbers decoded straight to float."""
+    return ijson.items(stream, 'in_network.item', use_float=True)
+
+
+def item_prices(item):
+    """Every negotiated_prices entry of one in_network item, flattened across its negotiated_rates."""
+    return list(chain.from_iterable(
+        rate_info['negotiated_prices']
+        for rate_info in item.get('negotiated_rates') or ()
+        if 'negotiated_prices' in rate_info
+    ))
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_iso_date(text):
+    """datetime.date for a YYYY-MM-DD string, None if it does not parse."""
+    try:
+        return datetime.date.fromisoformat(text)
+    except ValueError:
+        return None
+
+
+def intern_str(value):
+    """sys.intern for str values; anything else (None, numbers, lists) is returned unchanged."""
+    if type(value) is str:
+        return sys.intern(value)
+    return value
+
+
+def cache_key(text):
+    """16-hex-digit key for cache file names; BLAKE2b is in hashlib and faster than SHA-256."""
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+
+def signed_url_expired(url):
+    """True when a signed URL's Expires query parameter (epoch seconds) is already in the past."""
+    for value in urllib.parse.parse_qs(urllib.parse.urlsplit(url).query).get('Expires', ()):
+        try:
+            return int(value) < time.time()
+        except ValueError:
+            return False
+    return False
+
+
+_BILLING_CLASS_NAMES = {}
+
+
+def billing_class_name(raw):
+    """Normalized, interned billing_class ('unknown' when blank)."""
+    try:
+        return _BILLING_CLASS_NAMES[raw]
+    except (KeyError, TypeError):
+        pass
+    name = sys.intern((raw or 'unknown').strip() or 'unknown')
+    if len(_BILLING_CLASS_NAMES) < 4096:
+        _BILLING_CLASS_NAMES[raw] = name
+    return name
+
+
+_CODE_TUPLES = {(): ()}
+
+
+def intern_codes(value):
+    """Shared tuple of interned strings for a modifier / service_code list; anything else is returned as is."""
+    if type(value) is not list:
+        return value
+    try:
+        key = tuple(value)
+        return _CODE_TUPLES[key]
+    except KeyError:
+        pass
+    except TypeError:  # nested or unhashable entries
+        return value
+    codes = tuple(intern_str(v) for v in key)
+    if len(_CODE_TUPLES) < 4096:
+        _CODE_TUPLES[key] = codes
+    return codes
+
+
+def billing_code_name(raw):
+    """Stripped, interned billing_code ('' for None) so every table keyed by code shares one str per code."""
+    if raw is None:
+        return ''
+    return sys.intern(str(raw).strip())
+
+
+def _counts_for_cpt_page(item):
+    """Items that fill a page of extract_cpt_pricing_paginated (and are skipped to reach later pages)."""
+    return item.get('billing_code_type') == 'CPT' and bool(item.get('billing_code'))
+
+
+def _counts_for_compare_page(item):
+    """Items that fill a page of compare_paginated."""
+    return item.get('billing_code_type') == 'CPT' and bool(billing_code_name(item.get('billing_code')))
+
+
+@contextlib.contextmanager
+def gc_paused():
+    """Suspend the cyclic garbage collector while bulk-building acyclic dicts and lists."""
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+# Header tokens used to auto-detect the code, price and description columns of uploads.
+CPT_HEADER_TOKENS = ('cpt', 'code', 'proc_cd', 'procedure', 'hcpcs')
+PRICE_HEADER_TOKENS = ('price', 'rate', 'amount', 'cost', 'fee', 'allowance', 'calc_rate')
+DESC_HEADER_TOKENS = ('desc', 'description', 'name')
+
+
+def _header_matches(col_lower, tokens, exclude=()):
+    """True if a lowercased header contains any of `tokens` and none of `exclude`."""
+    return any(t in col_lower for t in tokens) and not any(e in col_lower for e in exclude)
+
+
+# Comparison buckets, indexed by sign(source1 rate - source2 rate) + 1.
+BUCKETS = ('higher_in_source2', 'equal', 'higher_in_source1')
+BUCKET_AMOUNT_KEYS = ('total_higher_in_source2_amount', None, 'total_higher_in_source1_amount')
+BUCKET_IDS = {name: idx for idx, name in enumerate(BUCKETS)}
+
+# compare_rule values the incremental (per-part) compare supports; see _init_source1_summary.
+STREAMING_COMPARE_RULES = frozenset(('max', 'min', 'avg', 'median', 'all_classes', 'max_avg_by_billing_class', 'per_occurrence'))
+
+
+def classify_rates(rate1, rate2):
+    """(bucket id into BUCKETS, rate1 - rate2, percent difference relative to the larger rate)."""
+    difference = rate1 - rate2
+    top = rate2 if rate2 > rate1 else rate1
+    percent = (abs(difference) / top * 100) if top > 0 else 0
+    return (difference > 0) - (difference < 0) + 1, difference, percent
+
+
+def classify_rate_arrays(rate1, rate2):
+    """classify_rates over aligned float64 arrays: (bucket ids, differences, percents)."""
+    difference = rate1 - rate2
+    top = np.maximum(rate1, rate2)
+    positive = top > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percent = np.where(positive, np.abs(difference) / top * 100, 0.0).tolist()
+    for i in np.flatnonzero(~positive).tolist():
+        percent[i] = 0
+    bucket = (difference > 0).astype(np.int64) - (difference < 0) + 1
+    return bucket, difference, percent
+
+
+def partition_keys(first, second):
+    """(keys in both, keys only in `first`, keys only in `second`) of two dicts, in insertion order."""
+    both = []
+    only_first = []
+    for key in first:
+        if key in second:
+            both.append(key)
+        else:
+            only_first.append(key)
+    only_second = [key for key in second if key not in first]
+    return both, only_first, only_second
+
+
+# One pooled session for all outbound requests, so ranged part downloads and repeat fetches
+# from the same MRF host reuse connections instead of a fresh TCP+TLS handshake each time.
+http_session = requests.Session()
+_http_adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=Retry(total=2, backoff_factor=0.3))
+http_session.mount('http://', _http_adapter)
+http_session.mount('https://', _http_adapter)
+
+# Buffer size for upload copies that cannot go through os.sendfile.
+UPLOAD_COPY_BUFFER = 1 << 20
+
+# Bytes of CSV text buffered before each write of a streamed CSV export.
+CSV_STREAM_FLUSH_BYTES = 1 << 16
+
+# Below this many rates the plain Python loops are cheaper than building NumPy arrays.
+NUMPY_MIN_RATES = 64
+
+# incremental_compare_parts only spawns worker processes for at least this many bytes of
+# parts; each spawned worker re-imports the app (Flask, pandas, NumPy) before it starts.
+PARALLEL_PARTS_MIN_BYTES = 256 * 1024 * 1024
+
+# Bump when _add_cpt_entry changes what it builds, so stale parsed-MRF sidecars are ignored.
+PRICING_SIDECAR_VERSION = 1
 
 
 class MultiPartStream:
@@ -21,51 +304,166 @@ class MultiPartStream:
 
     def __init__(self, paths):
         self.paths = paths
-        self.handles = []
-        self.idx = 0
+        self.iter_paths = iter(paths)
+        self.next_path = next(self.iter_paths, None)
+        self.current = None
         self.closed = False
 
-    def _open_next(self):
-        while self.idx < len(self.paths):
-            handle = open(self.paths[self.idx], 'rb')
-            self.handles.append(handle)
-            self.idx += 1
-            return handle
-        return None
+    def _advance(self):
+        """Open the next part, closing the finished one first. Returns False once all parts are consumed."""
+        if self.current is not None:
+            self.current.close()
+            self.current = None
+        path = self.next_path
+        if path is None:
+            return False
+        self.next_path = next(self.iter_paths, None)
+        self.current = open(path, 'rb')
+        _fadvise(self.current.fileno(), 'POSIX_FADV_SEQUENTIAL')
+        if self.next_path is not None:
+            # Start pulling the following part into the page cache while this one is parsed.
+            try:
+                fd = os.open(self.next_path, os.O_RDONLY)
+            except OSError:
+                pass
+            else:
+                try:
+                    _fadvise(fd, 'POSIX_FADV_WILLNEED')
+                finally:
+                    os.close(fd)
+        return True
+
+    def _read_all_parts(self):
+        if self.current is None:
+            self._advance()
+        while self.current is not None:
+            yield self.current.read()
+            self._advance()
 
     def read(self, size=-1):
         if self.closed:
             return b''
-        chunks = []
-        remaining = size
+        if size is None or size < 0:
+            return b''.join(self._read_all_parts())
+        buf = bytearray(size)
+        filled = self.readinto(buf)
+        if filled == size:
+            return bytes(buf)
+        return bytes(memoryview(buf)[:filled])
+
+    def readinto(self, buffer):
+        """Fill `buffer` from the current part without an intermediate bytes object."""
+        if self.closed:
+            return 0
+        view = memoryview(buffer).cast('B')
+        filled = 0
+        while filled < len(view):
+            if self.current is None and not self._advance():
+                break
+            n = self.current.readinto(view[filled:])
+            if not n:
+                if not self._advance():
+                    break
+                continue
+            filled += n
+        return filled
 
-        while remaining != 0:
-            if not self.handles or self.handles[-1].closed:
-                handle = self._open_next()
-            else:
-                handle = self.handles[-1]
+    def readable(self):
+        return True
 
-            if handle is None:
-                break
+    def __enter__(self):
+        return self
 
-            if remaining == -1:
-                data = handle.read()
-            else:
-                data = handle.read(remaining)
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
 
-            if data:
-                chunks.append(data)
-                if remaining != -1:
-                    remaining -= len(data)
-            else:
-                handle.close()
-                continue
+    def close(self):
+        if self.closed:
+            return
+        if self.current is not None:
+            try:
+                self.current.close()
+            except Exception:
+                pass
+            self.current = None
+        self.closed = True
 
-        return b''.join(chunks)
+class CachingResponseStream:
+    """read() source over an HTTP response that saves the body to `cache_path` once it is fully read."""
+
+    def __init__(self, raw, cache_path=None):
+        self.raw = raw
+        self.cache_path = cache_path
+        self.cache = None
+        self.part_path = None
+        self.pending = b''
+        self.head = b''  # first bytes of the body, for error previews
+        self.complete = False
+        self.closed = False
+        if cache_path:
+            try:
+                fd, self.part_path = tempfile.mkstemp(
+                    dir=os.path.dirname(cache_path) or '.', prefix=os.path.basename(cache_path) + '.', suffix='.part'
+                )
+                self.cache = os.fdopen(fd, 'wb')
+            except OSError as e:
+                print(f"Warning: Unable to write cache file {cache_path}: {e}")
+
+    def _read_raw(self, size):
+        chunk = self.raw.read() if size is None or size < 0 else self.raw.read(size)
+        if not chunk:
+            self.complete = True
+            return chunk
+        if len(self.head) < 100:
+            self.head += chunk[:100 - len(self.head)]
+        if self.cache is not None:
+            try:
+                self.cache.write(chunk)
+            except OSError as e:
+                print(f"Warning: Unable to write cache file {self.cache_path}: {e}")
+                self.discard_cache()
+        return chunk
+
+    def peek(self, size=1):
+        """Up to `size` upcoming bytes without consuming them (used to sniff the gzip magic)."""
+        if len(self.pending) < size and not self.complete:
+            self.pending += self._read_raw(size - len(self.pending))
+        return self.pending[:size]
+
+    def read(self, size=-1):
+        if self.closed:
+            return b''
+        if self.pending:
+            head = self.pending
+            if size is None or size < 0:
+                self.pending = b''
+                return head + self._read_raw(-1)
+            self.pending = head[size:]
+            return head[:size]
+        if size == 0:
+            return b''
+        return self._read_raw(size)
+
+    def drain(self):
+        """Read the rest of the body so the cache copy is complete."""
+        self.pending = b''
+        while self._read_raw(1 << 20):
+            pass
 
     def readable(self):
         return True
 
+    def discard_cache(self):
+        """Drop the partial cache copy, e.g. when the body turned out not to be an MRF."""
+        if self.cache is None:
+            return
+        try:
+            self.cache.close()
+            os.remove(self.part_path)
+        except OSError:
+            pass
+        self.cache = None
+
     def __enter__(self):
         return self
 
@@ -75,19 +473,471 @@ class MultiPartStream:
     def close(self):
         if self.closed:
             return
-        for h in self.handles:
+        if self.cache is not None:
+            if self.complete:
+                self.cache.close()
+                self.cache = None
+                try:
+                    os.replace(self.part_path, self.cache_path)
+                except OSError as e:
+                    print(f"Warning: Unable to write cache file {self.cache_path}: {e}")
+            else:
+                self.discard_cache()
+        self.raw.close()
+        self.closed = True
+
+
+class SpillingLRU:
+    """Dict-like session store: `max_entries` in memory, older ones pickled to `spill_dir` and dropped after `ttl`."""
+
+    _SAFE_KEY = re.compile(r'[A-Za-z0-9_-]{1,128}')
+
+    def __init__(self, spill_dir, suffix, max_entries=32, on_spill=None, ttl=3600):
+        self.spill_dir = spill_dir
+        self.suffix = suffix
+        self.max_entries = max_entries
+        self.on_spill = on_spill  # called with (key, value) before a value leaves memory
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self._last_sweep = 0.0
+
+    def _spill_files(self):
+        try:
+            names = os.listdir(self.spill_dir)
+        except OSError:
+            return []
+        return [os.path.join(self.spill_dir, name) for name in names if name.endswith(self.suffix)]
+
+    def _sweep(self):
+        # At most one directory scan per minute; spill files are only as fresh as their mtime.
+        now = time.time()
+        if now - self._last_sweep < 60:
+            return
+        self._last_sweep = now
+        cutoff = now - self.ttl
+        for path in self._spill_files():
             try:
-                h.close()
-            except Exception:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
                 pass
-        self.closed = True
+
+    def _spill_path(self, key):
+        key = str(key)
+        if not self._SAFE_KEY.fullmatch(key):
+            return None
+        return os.path.join(self.spill_dir, key + self.suffix)
+
+    def _spill(self, key, value):
+        path = self._spill_path(key)
+        if path is None:
+            return False
+        tmp_path = path + '.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+            return True
+        except Exception as e:
+            print(f"Could not spill session {key}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return False
+
+    def _evict(self):
+        self._sweep()
+        pinned = []
+        while len(self.entries) > self.max_entries:
+            key, value = self.entries.popitem(last=False)
+            if self.on_spill is not None:
+                try:
+                    self.on_spill(key, value)
+                except Exception as e:
+                    print(f"Could not flush session {key} before spilling: {e}")
+            if not self._spill(key, value):
+                pinned.append((key, value))
+        # Anything that could not be written stays in memory as least recently used.
+        for key, value in reversed(pinned):
+            self.entries[key] = value
+            self.entries.move_to_end(key, last=False)
+
+    def get(self, key, default=None):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        self._sweep()
+        path = self._spill_path(key)
+        if path is None or not os.path.exists(path):
+            return default
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+            os.remove(path)
+        except Exception as e:
+            print(f"Could not reload session {key}: {e}")
+            return default
+        self[key] = value
+        return value
+
+    def __getitem__(self, key):
+        value = self.get(key, self)
+        if value is self:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_entries:
+            self._evict()
+
+    def __contains__(self, key):
+        if key in self.entries:
+            return True
+        path = self._spill_path(key)
+        return path is not None and os.path.exists(path)
+
+    def pop(self, key, default=None):
+        """Remove `key`. Returns its value if it was in memory; a spilled value is deleted unread."""
+        value = self.entries.pop(key, default)
+        path = self._spill_path(key)
+        if path is not None:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        return value
+
+    def __len__(self):
+        return len(self.entries) + len(self._spill_files())
+
+class UploadSessionStore:
+    """Uploaded-file sessions (file_id -> {'path', ...}), capped by `max_entries` and `ttl`; see `on_expire`."""
+
+    def __init__(self, on_expire, max_entries=256, ttl=3600):
+        self.on_expire = on_expire
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (last_used, entry), least recently used first
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        while self.entries:
+            key, (last_used, entry) = next(iter(self.entries.items()))
+            if len(self.entries) <= self.max_entries and last_used >= cutoff:
+                break
+            del self.entries[key]
+            self.on_expire(entry)
+
+    def get(self, key, default=None):
+        self._expire()
+        item = self.entries.get(key)
+        if item is None:
+            return default
+        self[key] = item[1]
+        return item[1]
+
+    def __contains__(self, key):
+        """Membership test only: does not refresh or expire entries (use get() for that)."""
+        item = self.entries.get(key)
+        return item is not None and item[0] >= time.time() - self.ttl
+
+    def __getitem__(self, key):
+        entry = self.get(key)
+        if entry is None:
+            raise KeyError(key)
+        return entry
+
+    def __setitem__(self, key, entry):
+        self.entries[key] = (time.time(), entry)
+        self.entries.move_to_end(key)
+        self._expire()
+
+    def pop(self, key, default=None):
+        """Remove `key` without expiring it (its file is still in use)."""
+        item = self.entries.pop(key, None)
+        return default if item is None else item[1]
+
+    def __len__(self):
+        return len(self.entries)
+
+class RateColumns:
+    """Struct-of-arrays view of one CPT code's rate dicts, built once and reused by every compare."""
+
+    __slots__ = ('rates', 'values', 'billing_classes', 'negotiated_types', 'expirations')
+
+    def __init__(self, rates, to_float, parse_date):
+        self.rates = rates
+        n = len(rates)
+        self.values = np.fromiter(
+            (to_float(r.get('negotiated_rate'), default=math.nan) for r in rates),
+            dtype=np.float64,
+            count=n
+        )
+        self.billing_classes = np.array(
+            [billing_class_name(r.get('billing_class')) for r in rates],
+            dtype=object
+        )
+        self.negotiated_types = np.array(
+            self._normalize_each((r.get('negotiated_type') for r in rates), lambda v: (v or '').strip().lower()),
+            dtype=object
+        )
+        self.expirations = self._parse_expirations([r.get('expiration_date') for r in rates], parse_date)
+
+    @staticmethod
+    def _normalize_each(raw, normalize):
+        """Apply `normalize` once per distinct raw value; repeats share the cached result object."""
+        seen = {}
+        out = []
+        for v in raw:
+            try:
+                norm = seen[v]
+            except KeyError:
+                norm = seen[v] = normalize(v)
+            except TypeError:  # unhashable junk in the source data
+                norm = normalize(v)
+            out.append(norm)
+        return out
+
+    @staticmethod
+    def _parse_expirations(raw, parse_date):
+        """datetime64[D] column for expiration values; NaT where parse_date would return None."""
+        strs = [str(v)[:10] if v else 'NaT' for v in raw]
+        # NumPy parses plain YYYY-MM-DD in C. It is looser than fromisoformat for other
+        # shapes (e.g. a bare year), so anything else goes through parse_date.
+        if all(len(v) == 10 or v == 'NaT' for v in strs):
+            try:
+                return np.array(strs, dtype='datetime64[D]')
+            except ValueError:
+                pass
+        dates = [parse_date(v) for v in raw]
+        return np.array([d if d is not None else 'NaT' for d in dates], dtype='datetime64[D]')
+
+    def __len__(self):
+        return len(self.rates)
+
+    def select(self, negotiated_type=None, exclude_expired=False, as_of=None):
+        """Index array of the rates _filter_rates would keep, or None when nothing is filtered out."""
+        negotiated_type = (negotiated_type or '').strip().lower()
+        if not negotiated_type and not exclude_expired:
+            return None
+        mask = np.ones(len(self.rates), dtype=bool)
+        if negotiated_type:
+            mask &= self.negotiated_types == negotiated_type
+        if exclude_expired:
+            as_of = np.datetime64(as_of or datetime.date.today(), 'D')
+            # NaT never compares less, so rates without a parseable date are kept.
+            mask &= ~(self.expirations < as_of)
+        return np.flatnonzero(mask)
+
+    def arrays(self, idx=None):
+        """(values, billing_classes) for the selected rates, numeric and finite only."""
+        vals = self.values
+        classes = self.billing_classes
+        if idx is not None:
+            vals = vals[idx]
+            classes = classes[idx]
+        keep = np.isfinite(vals)
+        if not keep.all():
+            vals = vals[keep]
+            classes = classes[keep]
+        return vals, classes
+
+    def take(self, idx=None):
+        if idx is None:
+            return self.rates
+        return [self.rates[i] for i in idx]
+
+class SourceRateColumns:
+    """Struct-of-arrays view of a whole source: every code's rates concatenated, with per-code offsets."""
+
+    __slots__ = ('codes', 'starts', 'counts', 'rates', 'parse_date', 'values', '_negotiated_types', '_expirations', '_billing_classes')
+
+    def __init__(self, cpt_data, to_float, parse_date):
+        self.codes = list(cpt_data)
+        rate_lists = [cpt_data[code].get('rates') or [] for code in self.codes]
+        self.counts = np.fromiter((len(rates) for rates in rate_lists), dtype=np.int64, count=len(rate_lists))
+        self.starts = np.zeros(len(rate_lists), dtype=np.int64)
+        if len(rate_lists) > 1:
+            np.cumsum(self.counts[:-1], out=self.starts[1:])
+        rates = self.rates = list(chain.from_iterable(rate_lists))
+        self.parse_date = parse_date
+        self.values = np.fromiter(
+            (to_float(r.get('negotiated_rate'), default=math.nan) for r in rates),
+            dtype=np.float64,
+            count=len(rates)
+        )
+        # Filter columns are built on first use; unfiltered compares never need them.
+        self._negotiated_types = None
+        self._expirations = None
+        self._billing_classes = None
+
+    @property
+    def billing_classes(self):
+        if self._billing_classes is None:
+            self._billing_classes = np.array([billing_class_name(r.get('billing_class')) for r in self.rates], dtype=object)
+        return self._billing_classes
+
+    @property
+    def negotiated_types(self):
+        if self._negotiated_types is None:
+            self._negotiated_types = np.array(
+                RateColumns._normalize_each((r.get('negotiated_type') for r in self.rates), lambda v: (v or '').strip().lower()),
+                dtype=object
+            )
+        return self._negotiated_types
+
+    @property
+    def expirations(self):
+        if self._expirations is None:
+            self._expirations = RateColumns._parse_expirations([r.get('expiration_date') for r in self.rates], self.parse_date)
+        return self._expirations
+
+    def rule_values(self, rule, negotiated_type=None, exclude_expired=False, as_of=None):
+        """{code: value} for rule max / min / avg under the _filter_rates filters; None for other rules."""
+        if rule not in ('max', 'min', 'avg'):
+            return None
+        vals = self.values
+        keep = self._keep_mask(negotiated_type, exclude_expired, as_of)
+
+        out = np.zeros(len(self.codes), dtype=np.float64)
+        # reduceat misreads empty segments, so only codes that have rates take part.
+        has_rates = self.counts > 0
+        starts = self.starts[has_rates]
+        if starts.size:
+            kept = np.add.reduceat(keep, starts)
+            if rule == 'max':
+                best = np.maximum.reduceat(np.where(keep, vals, 0.0), starts)
+                out[has_rates] = np.maximum(best, 0.0)
+            elif rule == 'min':
+                low = np.minimum.reduceat(np.where(keep, vals, np.inf), starts)
+                out[has_rates] = np.where(kept > 0, low, 0.0)
+            else:
+                totals = np.add.reduceat(np.where(keep, vals, 0.0), starts)
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    out[has_rates] = np.where(kept > 0, totals / kept, 0.0)
+        return dict(zip(self.codes, out.tolist()))
+
+    def max_with_class(self, negotiated_type=None, exclude_expired=False, as_of=None):
+        """{code: (max, billing_class)} as _max_rate_with_class reports them."""
+        n = len(self.codes)
+        best = np.zeros(n, dtype=np.float64)
+        classes = ['unknown'] * n
+        has_rates = self.counts > 0
+        starts = self.starts[has_rates]
+        if starts.size:
+            vals = np.where(self._keep_mask(negotiated_type, exclude_expired, as_of), self.values, 0.0)
+            best[has_rates] = np.maximum(np.maximum.reduceat(vals, starts), 0.0)
+            code_of_rate = np.repeat(np.arange(n), self.counts)
+            hits = np.flatnonzero((vals > 0.0) & (vals == best[code_of_rate]))
+            # Rates are in code order, so the first hit of each code is its first maximum.
+            hit_codes, first = np.unique(code_of_rate[hits], return_index=True)
+            winners = self.billing_classes[hits[first]]
+            for code_idx, billing_class in zip(hit_codes.tolist(), winners.tolist()):
+                classes[code_idx] = billing_class
+        return dict(zip(self.codes, zip(best.tolist(), classes)))
+
+    def _keep_mask(self, negotiated_type, exclude_expired, as_of):
+        """Rates that are numeric and pass the _filter_rates filters."""
+        keep = np.isfinite(self.values)
+        negotiated_type = (negotiated_type or '').strip().lower()
+        if negotiated_type:
+            keep &= self.negotiated_types == negotiated_type
+        if exclude_expired:
+            keep &= ~(self.expirations < np.datetime64(as_of or datetime.date.today(), 'D'))
+        return keep
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """jsonify()/request.get_json() through orjson, falling back to the stdlib provider when it refuses."""
+
+    def _dumps_bytes(self, obj, indent=None):
+        """UTF-8 JSON through orjson, or None when orjson is missing or cannot encode `obj`."""
+        if orjson is None:
+            return None
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=self.default, option=option)
+        except TypeError:
+            return None
+
+    def dumps(self, obj, **kwargs):
+        indent = kwargs.pop('indent', None)
+        kwargs.pop('default', None)
+        kwargs.pop('sort_keys', None)
+        data = self._dumps_bytes(obj, indent) if indent in (None, 2) and not kwargs else None
+        if data is None:
+            return super().dumps(obj, indent=indent, **kwargs)
+        return data.decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        try:
+            return orjson.loads(s)
+        except ValueError:  # e.g. NaN/Infinity literals, which the stdlib parser accepts
+            return super().loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = 2 if self.compact is False or (self.compact is None and self._app.debug) else None
+        # Hand orjson's bytes straight to the response instead of decoding and re-encoding them.
+        data = self._dumps_bytes(obj, indent)
+        if data is None:
+            data = super().dumps(obj, indent=indent).encode('utf-8')
+        return self._app.response_class(data + b'\n', mimetype=self.mimetype)
+
+    def _iter_chunks(self, obj, chunk_items):
+        """JSON of `obj` in pieces: str-keyed dicts key by key and long lists chunk_items at a time."""
+        if isinstance(obj, dict) and obj and all(type(key) is str for key in obj):
+            keys = sorted(obj) if self.sort_keys else list(obj)
+            yield b'{'
+            for idx, key in enumerate(keys):
+                yield (b',' if idx else b'') + self._dumps_bytes_or_stdlib(key) + b':'
+                yield from self._iter_chunks(obj[key], chunk_items)
+            yield b'}'
+        elif isinstance(obj, list) and len(obj) > chunk_items:
+            yield b'['
+            for start in range(0, len(obj), chunk_items):
+                piece = self._dumps_bytes_or_stdlib(obj[start:start + chunk_items])
+                yield (b',' if start else b'') + piece[1:-1]
+            yield b']'
+        else:
+            yield self._dumps_bytes_or_stdlib(obj)
+
+    def _dumps_bytes_or_stdlib(self, obj):
+        data = self._dumps_bytes(obj)
+        return data if data is not None else super().dumps(obj).encode('utf-8')
+
+    def streamed_response(self, obj, chunk_items=1000):
+        """Like response(obj), but the body is generated piecewise. Always compact."""
+        def generate():
+            yield from self._iter_chunks(obj, chunk_items)
+            yield b'\n'
+        return self._app.response_class(generate(), mimetype=self.mimetype)
+
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 
 class CPTPricingAnalyzer:
     def __init__(self):
         self.data_sources = {}
         self.cpt_pricing = {}  # Store CPT pricing by source
+        self.rate_columns = {}  # source -> code -> RateColumns, built lazily from cpt_pricing
+        self.source_columns = {}  # source -> SourceRateColumns, built lazily from cpt_pricing
+        self._modifier_keys = {}  # modifier tuple -> sorted, stripped context key
+        self.rate_stats = {}  # source -> filter key -> (code, kind) -> per-code aggregate
+        self.rate_stats_filter_limit = 8  # filter configurations kept per source (LRU)
+        # (source1, source2, rule, filter key) -> compare_pricing result, dropped when either source is stored again
+        self.comparison_cache = OrderedDict()
+        self.comparison_cache_limit = 8
         # Use /tmp for serverless environments (like Vercel)
         base_dir = '/tmp' if os.environ.get('VERCEL') else os.path.dirname(__file__)
         self.cache_dir = os.path.join(base_dir, 'cached_mrf_files')
@@ -97,14 +947,97 @@ class CPTPricingAnalyzer:
         self.comparison_session_dir = os.path.join(self.cache_dir, 'comparison_sessions')
         os.makedirs(self.comparison_session_dir, exist_ok=True)
         self.large_file_threshold = 300 * 1024 * 1024  # 300 MB
+        self.download_dir = os.path.join(self.cache_dir, 'downloads')
+        os.makedirs(self.download_dir, exist_ok=True)
+        self.download_part_size = 64 * 1024 * 1024  # bytes per ranged GET
+        self.download_workers = 4
         self.preview_limit = 10000
-        self.multipart_sessions = {}  # session_id -> {'paths': [...], 'source_name': str}
-        self.incremental_compare_sessions = {}  # session_id -> runtime state
+        # (file_path, kind) -> open item stream parked after the last page served, so the next
+        # page of a paginated load/compare resumes there instead of re-parsing skipped items.
+        self.page_cursors = OrderedDict()
+        self.page_cursor_limit = 4
+        # file_id -> uploaded file awaiting further pages, one registry per kind; kept apart from
+        # data_sources so expiring them never touches loaded sources.
+        self.large_upload_sessions = UploadSessionStore(self._discard_upload_session)  # /upload, too large to load
+        self.paginated_sessions = UploadSessionStore(self._discard_upload_session)  # /load_paginated
+        self.compare_sessions = UploadSessionStore(self._discard_upload_session)  # /compare_paginated
+        self.session_spill_dir = os.path.join(self.cache_dir, 'session_spill')
+        os.makedirs(self.session_spill_dir, exist_ok=True)
+        self.multipart_sessions = SpillingLRU(self.session_spill_dir, '.multipart.pkl')  # session_id -> {'paths': [...], 'source_name': str}
+        self.incremental_compare_sessions = SpillingLRU(self.session_spill_dir, '.incremental.pkl',
+                                                        on_spill=lambda key, state: self.flush_incremental_session_summary(state))  # session_id -> runtime state
         self.incremental_sample_limit = 2000
         self.incremental_only_in_source1_sample_limit = 100
         self.incremental_only_in_source2_sample_limit = 50
+        self.streaming_median_exact_limit = 64  # per-code rates kept exactly before switching to the log-bucket sketch
+        # The saved JSON summary (read when a session is no longer in memory) is rewritten every
+        # N parts or after this many seconds, whichever comes first, not after every part.
+        self.incremental_persist_every = 16
+        self.incremental_persist_interval = 30.0
+        # job_id -> (submitted_at, Future of a route payload), for comparisons run off the request thread.
+        # A finished job is dropped once its result is fetched, or comparison_job_ttl seconds after submission.
+        self.comparison_jobs = OrderedDict()
+        self.comparison_job_limit = 64  # jobs tracked at once, running or finished; new ones are refused beyond it
+        self.comparison_job_ttl = 3600
+        self.comparison_job_workers = 2
+        # Threads start on the first submit, so creating the pool here costs nothing per process.
+        self._comparison_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.comparison_job_workers, thread_name_prefix='comparison-job'
+        )
+        self._comparison_jobs_lock = threading.Lock()
+
+    def _store_cpt_pricing(self, source_name, cpt_data):
+        """Register parsed pricing for a source and drop any derived per-source tables."""
+        self.cpt_pricing[source_name] = cpt_data
+        self.rate_columns.pop(source_name, None)
+        self.source_columns.pop(source_name, None)
+        self.rate_stats.pop(source_name, None)
+        for key in [key for key in self.comparison_cache if source_name in key[:2]]:
+            del self.comparison_cache[key]
+
+    def _source_columns_for(self, source_name):
+        columns = self.source_columns.get(source_name)
+        if columns is None:
+            columns = SourceRateColumns(self.cpt_pricing[source_name], self._to_float, self._parse_date_yyyy_mm_dd)
+            self.source_columns[source_name] = columns
+        return columns
+
+    def _source_rule_values(self, source_name, rule, negotiated_type=None, exclude_expired=False, as_of=None):
+        """{code: rule value} for a whole source from its SourceRateColumns; None where only the per-code path applies."""
+        if rule not in ('max', 'min', 'avg'):
+            return None
+        columns = self._source_columns_for(source_name)
+        return self._code_stat(
+            (source_name, None), ('source_rule', rule), negotiated_type, exclude_expired, as_of,
+            lambda: columns.rule_values(rule, negotiated_type=negotiated_type, exclude_expired=exclude_expired, as_of=as_of)
+        )
+
+    def _source_max_with_class(self, source_name, negotiated_type=None, exclude_expired=False, as_of=None):
+        """{code: (max, billing_class)} for a whole source; see SourceRateColumns.max_with_class."""
+        columns = self._source_columns_for(source_name)
+        return self._code_stat(
+            (source_name, None), 'source_max_with_class', negotiated_type, exclude_expired, as_of,
+            lambda: columns.max_with_class(negotiated_type=negotiated_type, exclude_expired=exclude_expired, as_of=as_of)
+        )
+
+    def _rate_columns(self, source_name, code):
+        """Columnar view of the rates for one code; None for short lists where dict loops win."""
+        info = self.cpt_pricing.get(source_name, {}).get(code)
+        rates = (info or {}).get('rates') or []
+        if len(rates) < NUMPY_MIN_RATES:
+            return None
+        by_code = self.rate_columns.setdefault(source_name, {})
+        columns = by_code.get(code)
+        if columns is None or columns.rates is not rates:
+            columns = RateColumns(rates, self._to_float, self._parse_date_yyyy_mm_dd)
+            by_code[code] = columns
+        return columns
 
     def _to_float(self, value, default=0.0):
+        if type(value) is float:  # what the JSON parsers hand back; skip the generic path
+            return value if math.isfinite(value) else default
+        if type(value) is int:  # whole-dollar rates parse as int even with use_float=True
+            return float(value)
         try:
             if value is None:
                 return default
@@ -117,6 +1050,10 @@ class CPTPricingAnalyzer:
 
     def _try_float(self, value):
         """Return float(value) if numeric+finite else None (prevents biasing AVG/MEDIAN with 0)."""
+        if type(value) is float:
+            return value if math.isfinite(value) else None
+        if type(value) is int:
+            return float(value)
         try:
             if value is None:
                 return None
@@ -130,129 +1067,268 @@ class CPTPricingAnalyzer:
     def _parse_date_yyyy_mm_dd(self, value):
         if not value:
             return None
+        if type(value) is str:
+            return _parse_iso_date(value[:10])
         try:
             return datetime.date.fromisoformat(str(value)[:10])
         except Exception:
             return None
 
-    def _filter_rates(self, rates, negotiated_type=None, exclude_expired=False, as_of=None):
-        negotiated_type = (negotiated_type or '').strip().lower()
-        as_of = as_of or datetime.date.today()
-        out = []
-
-        for rate in rates or []:
-            if negotiated_type:
-                nt = (rate.get('negotiated_type') or '').strip().lower()
-                if nt != negotiated_type:
-                    continue
-
-            if exclude_expired:
-                exp = self._parse_date_yyyy_mm_dd(rate.get('expiration_date'))
-                if exp is not None and exp < as_of:
-                    continue
+    def _make_price_filter(self, negotiated_type, exclude_expired, as_of):
+        """Predicate price -> keep for the negotiated_type / expiry filters, None when nothing is filtered."""
+        if not negotiated_type and not exclude_expired:
+            return None
+        parse_date = self._parse_date_yyyy_mm_dd
+        type_matches = {}
+        expired_by_value = {}
 
-            out.append(rate)
+        def type_ok(price):
+            raw = price.get('negotiated_type')
+            try:
+                return type_matches[raw]
+            except KeyError:
+                ok = type_matches[raw] = (raw or '').strip().lower() == negotiated_type
+                return ok
+            except TypeError:  # unhashable value; cannot match a string type
+                return False
+
+        def not_expired(price):
+            raw = price.get('expiration_date')
+            try:
+                return expired_by_value[raw]
+            except KeyError:
+                exp = parse_date(raw)
+                ok = expired_by_value[raw] = exp is None or exp >= as_of
+                return ok
+            except TypeError:
+                exp = parse_date(raw)
+                return exp is None or exp >= as_of
+
+        if not exclude_expired:
+            return type_ok
+        if not negotiated_type:
+            return not_expired
+        return lambda price: type_ok(price) and not_expired(price)
+
+    def _highest_price(self, item, keep_price=None):
+        """(rate, billing_class) of the first highest positive price in an MRF item, else (0.0, 'unknown')."""
+        to_float = self._to_float
+        isfinite = math.isfinite
+        best = 0.0
+        best_price = None
+        for price in item_prices(item):
+            if keep_price is not None and not keep_price(price):
+                continue
+            val = price.get('negotiated_rate', 0)
+            if type(val) is not float or not isfinite(val):
+                val = to_float(val)
+            if val > best:
+                best = val
+                best_price = price
+        if best_price is None:
+            return 0.0, 'unknown'
+        return best, billing_class_name(best_price.get('billing_class'))
+
+    def _occurrence_kernel(self, negotiated_type, exclude_expired, as_of):
+        """item -> _highest_price(item), specialized for one (negotiated_type, exclude_expired, as_of)."""
+        if not negotiated_type and not exclude_expired:
+            return self._highest_price
+        to_float = self._to_float
+        parse_date = self._parse_date_yyyy_mm_dd
+        isfinite = math.isfinite
+        type_matches = {}
+        expired_by_value = {}
+
+        def kernel(item):
+            best = 0.0
+            best_price = None
+            for price in item_prices(item):
+                if negotiated_type:
+                    raw = price.get('negotiated_type')
+                    try:
+                        keep = type_matches[raw]
+                    except KeyError:
+                        keep = type_matches[raw] = (raw or '').strip().lower() == negotiated_type
+                    except TypeError:  # unhashable value; cannot match a string type
+                        keep = False
+                    if not keep:
+                        continue
+                if exclude_expired:
+                    raw = price.get('expiration_date')
+                    try:
+                        keep = expired_by_value[raw]
+                    except KeyError:
+                        exp = parse_date(raw)
+                        keep = expired_by_value[raw] = exp is None or exp >= as_of
+                    except TypeError:
+                        exp = parse_date(raw)
+                        keep = exp is None or exp >= as_of
+                    if not keep:
+                        continue
+                val = price.get('negotiated_rate', 0)
+                if type(val) is not float or not isfinite(val):
+                    val = to_float(val)
+                if val > best:
+                    best = val
+                    best_price = price
+            if best_price is None:
+                return 0.0, 'unknown'
+            return best, billing_class_name(best_price.get('billing_class'))
+
+        return kernel
+
+    def _filter_rates(self, rates, negotiated_type=None, exclude_expired=False, as_of=None, source_code=None):
+        """Rates passing the negotiated_type / expiry filters; source_code=(source_name, code) goes columnar."""
+        if not exclude_expired and not (negotiated_type or '').strip():
+            return rates or []
+
+        columns = self._rate_columns(*source_code) if source_code else None
+        if columns is not None:
+            # Same rules as below, evaluated as one mask over the precomputed columns.
+            return columns.take(columns.select(negotiated_type=negotiated_type, exclude_expired=exclude_expired, as_of=as_of))
+
+        # Same predicate the streaming passes use: each distinct raw type / expiry is checked once.
+        keep_rate = self._make_price_filter(
+            (negotiated_type or '').strip().lower(), exclude_expired, as_of or datetime.date.today()
+        )
+        return [rate for rate in rates or [] if keep_rate(rate)]
 
-        return out
+    class _LogBinQuantile:
+        """Streaming quantile sketch over relative-error log buckets (DDSketch-style)."""
 
-    class _P2Quantile:
-        """
-        P² (P-square) streaming quantile estimator.
-        Constant memory; good for large streams where exact median is expensive.
-        """
+        batch_size = 512
 
-        def __init__(self, quantile=0.5):
+        def __init__(self, quantile=0.5, relative_accuracy=0.005):
             self.q = float(quantile)
+            self.gamma = (1.0 + relative_accuracy) / (1.0 - relative_accuracy)
+            self.log_gamma = math.log(self.gamma)
             self.n = 0
-            self.initial = []
-            # Marker positions (n_i), desired positions (n'_i), increments (d_i), heights (q_i)
-            self.ni = [0, 0, 0, 0, 0]
-            self.np = [0.0, 0.0, 0.0, 0.0, 0.0]
-            self.di = [0.0, 0.0, 0.0, 0.0, 0.0]
-            self.qi = [0.0, 0.0, 0.0, 0.0, 0.0]
+            self.zeros = 0
+            self.positive = {}  # bucket index -> [count, lo, hi] of the magnitudes binned there
+            self.negative = {}  # bucket index of -x -> [count, lo, hi]
+            self.pending = []
 
         def add(self, x):
-            x = float(x)
-            self.n += 1
-
-            # Bootstrap with first 5 samples
-            if self.n <= 5:
-                self.initial.append(x)
-                if self.n == 5:
-                    self.initial.sort()
-                    self.qi = self.initial[:]  # marker heights
-                    self.ni = [1, 2, 3, 4, 5]   # marker positions
-                    q = self.q
-                    self.np = [1.0, 1.0 + 2.0 * q, 1.0 + 4.0 * q, 3.0 + 2.0 * q, 5.0]
-                    self.di = [0.0, q / 2.0, q, (1.0 + q) / 2.0, 1.0]
-                return
-
-            # Find k: bucket for x and update end markers if needed
-            if x < self.qi[0]:
-                self.qi[0] = x
-                k = 0
-            elif x < self.qi[1]:
-                k = 0
-            elif x < self.qi[2]:
-                k = 1
-            elif x < self.qi[3]:
-                k = 2
-            elif x < self.qi[4]:
-                k = 3
+            self.pending.append(float(x))
+            if len(self.pending) >= self.batch_size:
+                self.flush()
+
+        def add_many(self, values):
+            self.pending.extend(values)
+            if len(self.pending) >= self.batch_size:
+                self.flush()
+
+        @staticmethod
+        def _add_bucket(buckets, key, count, lo, hi):
+            entry = buckets.get(key)
+            if entry is None:
+                buckets[key] = [count, lo, hi]
             else:
-                self.qi[4] = x
-                k = 3
-
-            # Increment positions of markers above k
-            for i in range(k + 1, 5):
-                self.ni[i] += 1
-
-            # Update desired positions
-            for i in range(5):
-                self.np[i] += self.di[i]
-
-            # Adjust heights of markers 2..4 (index 1..3)
-            for i in (1, 2, 3):
-                d = self.np[i] - self.ni[i]
-                if (d >= 1.0 and self.ni[i + 1] - self.ni[i] > 1) or (d <= -1.0 and self.ni[i - 1] - self.ni[i] < -1):
-                    s = 1 if d > 0 else -1
-                    # Parabolic prediction
-                    qip1 = self.qi[i + 1]
-                    qi = self.qi[i]
-                    qim1 = self.qi[i - 1]
-                    nip1 = self.ni[i + 1]
-                    ni = self.ni[i]
-                    nim1 = self.ni[i - 1]
-
-                    denom = (nip1 - nim1)
-                    if denom == 0:
-                        continue
-
-                    qp = qi + (s / denom) * (
-                        (ni - nim1 + s) * (qip1 - qi) / (nip1 - ni) +
-                        (nip1 - ni - s) * (qi - qim1) / (ni - nim1)
-                    )
-
-                    # If parabolic is out of bounds, use linear
-                    if qp <= min(qim1, qip1) or qp >= max(qim1, qip1) or math.isnan(qp):
-                        qp = qi + s * (self.qi[i + s] - qi) / (self.ni[i + s] - ni)
-
-                    self.qi[i] = qp
-                    self.ni[i] += s
+                entry[0] += count
+                if lo < entry[1]:
+                    entry[1] = lo
+                if hi > entry[2]:
+                    entry[2] = hi
+
+        def _bin(self, magnitudes, buckets):
+            idx = np.ceil(np.log(magnitudes) / self.log_gamma).astype(np.int64)
+            order = np.argsort(idx, kind='stable')
+            idx = idx[order]
+            magnitudes = magnitudes[order]
+            keys, starts, counts = np.unique(idx, return_index=True, return_counts=True)
+            los = np.minimum.reduceat(magnitudes, starts)
+            his = np.maximum.reduceat(magnitudes, starts)
+            for key, count, lo, hi in zip(keys.tolist(), counts.tolist(), los.tolist(), his.tolist()):
+                self._add_bucket(buckets, key, count, lo, hi)
+
+        def flush(self):
+            if not self.pending:
+                return
+            values = np.asarray(self.pending, dtype=np.float64)
+            self.pending = []
+            values = values[np.isfinite(values)]
+            self.n += int(values.size)
+            positive = values[values > 0]
+            negative = values[values < 0]
+            self.zeros += int(values.size - positive.size - negative.size)
+            if positive.size:
+                self._bin(positive, self.positive)
+            if negative.size:
+                self._bin(-negative, self.negative)
+
+        def merge(self, other):
+            """Add another sketch's samples (same relative accuracy) into this one."""
+            other.flush()
+            self.flush()
+            self.n += other.n
+            self.zeros += other.zeros
+            for mine, theirs in ((self.positive, other.positive), (self.negative, other.negative)):
+                for key, (count, lo, hi) in theirs.items():
+                    self._add_bucket(mine, key, count, lo, hi)
+
+        def _bucket_value(self, buckets, key):
+            # Midpoint (in relative terms) of bucket (gamma**(key-1), gamma**key], clamped to
+            # the magnitudes actually binned there; exact when they are all the same value.
+            _, lo, hi = buckets[key]
+            if lo == hi:
+                return lo
+            return min(max(2.0 * self.gamma ** key / (self.gamma + 1.0), lo), hi)
 
         def value(self):
+            self.flush()
             if self.n == 0:
                 return 0.0
-            if self.n <= 5:
-                vals = sorted(self.initial)
-                mid = len(vals) // 2
-                if len(vals) % 2 == 1:
-                    return float(vals[mid])
-                return float((vals[mid - 1] + vals[mid]) / 2.0)
-            # Median marker is index 2
-            return float(self.qi[2])
-
-    def _rates_summary(self, rates):
+            rank = int(self.q * (self.n - 1))
+            seen = 0
+            for key in sorted(self.negative, reverse=True):
+                seen += self.negative[key][0]
+                if seen > rank:
+                    return -self._bucket_value(self.negative, key)
+            seen += self.zeros
+            if seen > rank:
+                return 0.0
+            for key in sorted(self.positive):
+                seen += self.positive[key][0]
+                if seen > rank:
+                    return self._bucket_value(self.positive, key)
+            return self._bucket_value(self.positive, max(self.positive))
+
+    def _rates_to_arrays(self, rates):
+        """Return (values, billing_classes) NumPy arrays holding only the numeric, finite rates."""
+        rates = rates or []
+        vals = np.fromiter(
+            (self._to_float(r.get('negotiated_rate'), default=math.nan) for r in rates),
+            dtype=np.float64,
+            count=len(rates)
+        )
+        classes = np.array(
+            [billing_class_name(r.get('billing_class')) for r in rates],
+            dtype=object
+        )
+        keep = np.isfinite(vals)
+        if not keep.all():
+            vals = vals[keep]
+            classes = classes[keep]
+        return vals, classes
+
+    def _arrays_for(self, rates, arrays=None):
+        if arrays is None and rates and len(rates) >= NUMPY_MIN_RATES:
+            arrays = self._rates_to_arrays(rates)
+        return arrays
+
+    def _rates_summary(self, rates, arrays=None):
+        arrays = self._arrays_for(rates, arrays)
+        if arrays is not None:
+            vals = arrays[0]
+            if not vals.size:
+                return {'count': 0, 'avg': 0.0, 'min': 0.0, 'max': 0.0}
+            return {
+                'count': int(vals.size),
+                'avg': float(vals.sum() / vals.size),
+                'min': float(vals.min()),
+                'max': float(vals.max()),
+            }
+
         total = 0.0
         count = 0
         min_rate = None
@@ -279,21 +1355,30 @@ class CPTPricingAnalyzer:
         classes = {}
 
         for rate in rates or []:
-            billing_class = (rate.get('billing_class') or 'unknown').strip() or 'unknown'
+            billing_class = billing_class_name(rate.get('billing_class'))
             if billing_class not in classes:
                 classes[billing_class] = {'sum': 0.0, 'count': 0, 'min': None, 'max': None}
             self._update_running_summary(classes[billing_class], rate.get('negotiated_rate'))
 
-        # Compute averages and pick a representative class (prefer non-unknown)
+        return self._summarize_classes(classes)
+
+    def _summarize_classes(self, running):
+        """_rates_summary_by_class's result from per-class {'sum', 'count', 'min', 'max'} summaries."""
+        classes = {}
+        for cls_name, summary in running.items():
+            count = summary['count']
+            classes[cls_name] = {
+                'sum': summary['sum'],
+                'count': count,
+                'min': summary['min'] if summary['min'] is not None else 0.0,
+                'max': summary['max'] if summary['max'] is not None else 0.0,
+                'avg': (summary['sum'] / count) if count else 0.0,
+            }
+
+        # Pick a representative class (prefer non-unknown)
         rep_class = None
         rep_avg = 0.0
 
-        for cls_name, summary in classes.items():
-            avg = (summary['sum'] / summary['count']) if summary['count'] else 0.0
-            summary['avg'] = avg
-            summary['min'] = summary['min'] if summary['min'] is not None else 0.0
-            summary['max'] = summary['max'] if summary['max'] is not None else 0.0
-
         # Prefer known classes if present
         ordered = [c for c in classes.keys() if c != 'unknown'] + (['unknown'] if 'unknown' in classes else [])
         for cls_name in ordered:
@@ -308,7 +1393,18 @@ class CPTPricingAnalyzer:
             'representative_avg': rep_avg,
         }
 
-    def _max_rate_with_class(self, rates):
+    def _max_rate_with_class(self, rates, arrays=None):
+        arrays = self._arrays_for(rates, arrays)
+        if arrays is not None:
+            vals, classes = arrays
+            if not vals.size:
+                return {'max': 0.0, 'billing_class': 'unknown', 'count': 0}
+            idx = int(np.argmax(vals))
+            # Matches the loop below: only a strictly positive rate replaces the 0.0 starting point.
+            if vals[idx] > 0.0:
+                return {'max': float(vals[idx]), 'billing_class': classes[idx], 'count': int(vals.size)}
+            return {'max': 0.0, 'billing_class': 'unknown', 'count': int(vals.size)}
+
         max_rate = 0.0
         max_class = 'unknown'
         count = 0
@@ -320,12 +1416,24 @@ class CPTPricingAnalyzer:
             count += 1
             if val > max_rate:
                 max_rate = val
-                max_class = (rate.get('billing_class') or 'unknown').strip() or 'unknown'
+                max_class = billing_class_name(rate.get('billing_class'))
 
         return {'max': max_rate, 'billing_class': max_class, 'count': count}
 
-    def _max_rate_by_class(self, rates):
+    def _max_rate_by_class(self, rates, arrays=None):
         """Return billing_class -> max negotiated_rate for that class."""
+        arrays = self._arrays_for(rates, arrays)
+        if arrays is not None:
+            vals, classes = arrays
+            if not vals.size:
+                return {}, 0
+            names, first_idx, inverse = np.unique(classes, return_index=True, return_inverse=True)
+            maxes = np.full(names.size, -np.inf)
+            np.maximum.at(maxes, inverse, vals)
+            # Keep first-seen class order, like the loop below.
+            order = np.argsort(first_idx, kind='stable')
+            return {names[i]: float(maxes[i]) for i in order}, int(vals.size)
+
         max_by_class = {}
         count = 0
         for rate in rates or []:
@@ -333,17 +1441,28 @@ class CPTPricingAnalyzer:
             if val is None:
                 continue
             count += 1
-            billing_class = (rate.get('billing_class') or 'unknown').strip() or 'unknown'
+            billing_class = billing_class_name(rate.get('billing_class'))
             prev = max_by_class.get(billing_class)
             if prev is None or val > prev:
                 max_by_class[billing_class] = val
         return max_by_class, count
 
     def _context_key(self, rate):
-        billing_class = (rate.get('billing_class') or 'unknown').strip() or 'unknown'
+        billing_class = billing_class_name(rate.get('billing_class'))
         modifiers = rate.get('billing_code_modifier') or []
+        if type(modifiers) is tuple:
+            # Shared tuples from intern_codes: normalize each distinct combination once.
+            try:
+                return billing_class, self._modifier_keys[modifiers]
+            except (KeyError, TypeError):
+                pass
         if isinstance(modifiers, (list, tuple, set)):
             modifier_key = tuple(sorted(str(m).strip() for m in modifiers if str(m).strip()))
+            if type(modifiers) is tuple and len(self._modifier_keys) < 4096:
+                try:
+                    self._modifier_keys[modifiers] = modifier_key
+                except TypeError:
+                    pass
         else:
             modifier_key = (str(modifiers).strip(),) if str(modifiers).strip() else ()
         return billing_class, modifier_key
@@ -363,7 +1482,15 @@ class CPTPricingAnalyzer:
                 out[key] = val
         return out, count
 
-    def _min_rate_with_class(self, rates):
+    def _min_rate_with_class(self, rates, arrays=None):
+        arrays = self._arrays_for(rates, arrays)
+        if arrays is not None:
+            vals, classes = arrays
+            if not vals.size:
+                return {'min': 0.0, 'billing_class': 'unknown', 'count': 0}
+            idx = int(np.argmin(vals))
+            return {'min': float(vals[idx]), 'billing_class': classes[idx], 'count': int(vals.size)}
+
         min_rate = None
         min_class = 'unknown'
         count = 0
@@ -375,11 +1502,24 @@ class CPTPricingAnalyzer:
             count += 1
             if min_rate is None or val < min_rate:
                 min_rate = val
-                min_class = (rate.get('billing_class') or 'unknown').strip() or 'unknown'
+                min_class = billing_class_name(rate.get('billing_class'))
 
         return {'min': (min_rate if min_rate is not None else 0.0), 'billing_class': min_class, 'count': count}
 
-    def _median_rate(self, rates):
+    def _median_rate(self, rates, arrays=None):
+        arrays = self._arrays_for(rates, arrays)
+        if arrays is not None:
+            arr = arrays[0]
+            n = int(arr.size)
+            if not n:
+                return 0.0
+            mid = n // 2
+            # Introselect (O(n)) instead of a full sort for a single order statistic.
+            if n % 2 == 1:
+                return float(np.partition(arr, mid)[mid])
+            part = np.partition(arr, [mid - 1, mid])
+            return float((part[mid - 1] + part[mid]) / 2.0)
+
         values = []
         for r in (rates or []):
             val = self._try_float(r.get('negotiated_rate'))
@@ -393,7 +1533,56 @@ class CPTPricingAnalyzer:
             return values[mid]
         return (values[mid - 1] + values[mid]) / 2.0
 
-    def _rate_for_rule(self, rates, rule, negotiated_type=None, exclude_expired=False, as_of=None):
+    def _rate_for_rule(self, rates, rule, negotiated_type=None, exclude_expired=False, as_of=None, source_code=None):
+        """_compute_rate_for_rule, memoized per (source, code, rule) when no filter applies."""
+        rule = (rule or 'max').strip().lower()
+        return self._code_stat(
+            source_code, ('rule', rule), negotiated_type, exclude_expired, as_of,
+            lambda: self._compute_rate_for_rule(
+                rates, rule, negotiated_type=negotiated_type, exclude_expired=exclude_expired, as_of=as_of,
+                columns=self._rate_columns(*source_code) if source_code else None
+            )
+        )
+
+    def _max_rate_by_class_for(self, rates, negotiated_type=None, exclude_expired=False, as_of=None, source_code=None):
+        return self._code_stat(
+            source_code, 'max_by_class', negotiated_type, exclude_expired, as_of,
+            lambda: self._max_rate_by_class(self._filter_rates(rates, negotiated_type=negotiated_type, exclude_expired=exclude_expired, as_of=as_of, source_code=source_code))
+        )
+
+    def _max_rate_by_context_for(self, rates, negotiated_type=None, exclude_expired=False, as_of=None, source_code=None):
+        return self._code_stat(
+            source_code, 'max_by_context', negotiated_type, exclude_expired, as_of,
+            lambda: self._max_rate_by_context(self._filter_rates(rates, negotiated_type=negotiated_type, exclude_expired=exclude_expired, as_of=as_of, source_code=source_code))
+        )
+
+    def _code_stat(self, source_code, kind, negotiated_type, exclude_expired, as_of, build):
+        """build() for one code's `kind` aggregate, memoized in rate_stats per source and filter."""
+        if source_code is None:
+            return build()
+        source_name, code = source_code
+        filter_key = (
+            (negotiated_type or '').strip().lower(),
+            (as_of or datetime.date.today()) if exclude_expired else None,
+        )
+        by_filter = self.rate_stats.get(source_name)
+        if by_filter is None:
+            by_filter = self.rate_stats[source_name] = OrderedDict()
+        stats = by_filter.get(filter_key)
+        if stats is None:
+            stats = by_filter[filter_key] = {}
+            while len(by_filter) > self.rate_stats_filter_limit:
+                by_filter.popitem(last=False)
+        else:
+            by_filter.move_to_end(filter_key)
+        key = (code, kind)
+        value = stats.get(key)
+        if value is None:
+            value = build()
+            stats[key] = value
+        return value
+
+    def _compute_rate_for_rule(self, rates, rule, negotiated_type=None, exclude_expired=False, as_of=None, columns=None):
         """
         Returns: (value: float, billing_class: str, meta: dict)
         rule one of:
@@ -402,28 +1591,39 @@ class CPTPricingAnalyzer:
           - avg
           - median
           - max_avg_by_billing_class
+        columns: optional RateColumns for `rates`; filtering then runs as a mask over it.
         """
         rule = (rule or 'max').strip().lower()
-        rates = self._filter_rates(rates, negotiated_type=negotiated_type, exclude_expired=exclude_expired, as_of=as_of)
+        if columns is not None:
+            idx = columns.select(negotiated_type=negotiated_type, exclude_expired=exclude_expired, as_of=as_of)
+            arrays = columns.arrays(idx)
+            rates = columns.take(idx) if rule == 'max_avg_by_billing_class' else None
+        else:
+            rates = self._filter_rates(rates, negotiated_type=negotiated_type, exclude_expired=exclude_expired, as_of=as_of)
+            # Extract the numeric columns once for large lists; every helper below reuses them.
+            arrays = self._arrays_for(rates)
 
         if rule == 'max':
-            info = self._max_rate_with_class(rates)
+            info = self._max_rate_with_class(rates, arrays)
             return info['max'], info.get('billing_class', 'unknown'), {'count': info.get('count', 0)}
 
         if rule == 'min':
-            info = self._min_rate_with_class(rates)
+            info = self._min_rate_with_class(rates, arrays)
             return info['min'], info.get('billing_class', 'unknown'), {'count': info.get('count', 0)}
 
         if rule == 'avg':
-            summary = self._rates_summary(rates)
+            summary = self._rates_summary(rates, arrays)
             return summary['avg'], 'unknown', {'count': summary.get('count', 0)}
 
         if rule == 'median':
-            numeric_count = 0
-            for r in (rates or []):
-                if self._try_float(r.get('negotiated_rate')) is not None:
-                    numeric_count += 1
-            return self._median_rate(rates), 'unknown', {'count': numeric_count}
+            if arrays is not None:
+                numeric_count = int(arrays[0].size)
+            else:
+                numeric_count = 0
+                for r in (rates or []):
+                    if self._try_float(r.get('negotiated_rate')) is not None:
+                        numeric_count += 1
+            return self._median_rate(rates, arrays), 'unknown', {'count': numeric_count}
 
         if rule == 'max_avg_by_billing_class':
             by_class = self._rates_summary_by_class(rates)
@@ -441,7 +1641,7 @@ class CPTPricingAnalyzer:
             raise ValueError("compare_rule=context returns multiple values; handle it in compare_pricing/incremental mode.")
 
         # fallback
-        info = self._max_rate_with_class(rates)
+        info = self._max_rate_with_class(rates, arrays)
         return info['max'], info.get('billing_class', 'unknown'), {'count': info.get('count', 0), 'fallback_rule': 'max'}
 
     def _update_running_summary(self, summary, value):
@@ -453,15 +1653,88 @@ class CPTPricingAnalyzer:
         summary['min'] = value if summary['min'] is None else min(summary['min'], value)
         summary['max'] = value if summary['max'] is None else max(summary['max'], value)
         
+    def _download_range(self, url, start, end, part_path):
+        """GET bytes start..end (inclusive) of `url` into `part_path`."""
+        headers = {'Range': f'bytes={start}-{end}', 'Accept-Encoding': 'identity'}
+        with http_session.get(url, headers=headers, stream=True, timeout=30) as response:
+            if response.status_code != 206:
+                raise requests.exceptions.RequestException(
+                    f"Server ignored range request (HTTP {response.status_code})"
+                )
+            with open(part_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=UPLOAD_COPY_BUFFER):
+                    f.write(chunk)
+        if os.path.getsize(part_path) != end - start + 1:
+            raise requests.exceptions.RequestException(f"Short read for bytes {start}-{end}")
+        return part_path
+
+    def _download_ranged_parts(self, url):
+        """Fetch a large URL as parallel ranged GETs into part files; None if ranges aren't usable."""
+        try:
+            head = http_session.head(url, allow_redirects=True, timeout=30,
+                                     headers={'Accept-Encoding': 'identity'})
+        except requests.exceptions.RequestException:
+            return None
+        size = int(head.headers.get('Content-Length') or 0)
+        if head.status_code != 200 or head.headers.get('Accept-Ranges', '').lower() != 'bytes':
+            return None
+        if size < self.large_file_threshold:
+            return None
+
+        prefix = os.path.join(self.download_dir, f"{cache_key(url)}_{uuid.uuid4().hex[:8]}")
+        ranges = [
+            (start, min(start + self.download_part_size, size) - 1, f"{prefix}.part{i:04d}")
+            for i, start in enumerate(range(0, size, self.download_part_size))
+        ]
+        target = head.url or url
+        paths = []
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.download_workers) as pool:
+                futures = [pool.submit(self._download_range, target, a, b, path) for a, b, path in ranges]
+                for future in futures:
+                    paths.append(future.result())
+        except Exception:
+            self._remove_parts(path for _, _, path in ranges)
+            raise
+        return paths
+
+    def _remove_parts(self, paths):
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
     def load_json_file(self, file_path_or_url, source_name):
         """Load JSON from file or URL"""
         try:
+            part_paths = None
             if file_path_or_url.startswith('http'):
-                response = requests.get(file_path_or_url, timeout=30)
-                data = json.loads(response.text)
+                part_paths = self._download_ranged_parts(file_path_or_url)
+            if part_paths:
+                try:
+                    with open(part_paths[0], 'rb') as f:
+                        gzipped = f.read(2) == b'\x1f\x8b'
+                    with MultiPartStream(part_paths) as stream:
+                        source = gzip_reader(stream) if gzipped else stream
+                        data = next(ijson.items(source, '', use_float=True))
+                finally:
+                    self._remove_parts(part_paths)
+            elif file_path_or_url.startswith('http'):
+                with http_session.get(file_path_or_url, stream=True, timeout=30) as response:
+                    size = int(response.headers.get('Content-Length') or 0)
+                    if 0 < size < self.large_file_threshold:
+                        # Parse the raw bytes directly; skips the bytes -> str decode of response.text.
+                        data = json_loads(response.content)
+                    else:
+                        response.raw.decode_content = True
+                        data = next(ijson.items(response.raw, '', use_float=True))
             else:
-                with open(file_path_or_url, 'r') as f:
-                    data = json.load(f)
+                with open(file_path_or_url, 'rb') as f:
+                    if os.path.getsize(file_path_or_url) < self.large_file_threshold:
+                        data = json_loads(f.read())
+                    else:
+                        data = next(ijson.items(f, '', use_float=True))
             
             self.data_sources[source_name] = data
             return True, "Data loaded successfully"
@@ -469,44 +1742,58 @@ class CPTPricingAnalyzer:
             return False, f"Error loading data: {str(e)}"
     
     def load_excel_file(self, file_path, source_name):
-        """Load CPT pricing from Excel file"""
+        """Load CPT pricing from Excel file (read-only openpyxl pass, no DataFrame)"""
+        try:
+            wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        except Exception as e:
+            return False, f"Error loading Excel: {str(e)}"
+
         try:
-            xl = pd.ExcelFile(file_path)
-            
             found_data = False
             cpt_data = {}
-            
-            for sheet_name in xl.sheet_names:
+
+            for ws in wb.worksheets:
                 try:
-                    df = pd.read_excel(file_path, sheet_name=sheet_name)
+                    header_row = next(ws.iter_rows(min_row=1, max_row=1, values_only=True), None)
+                    if not header_row:
+                        continue
                     cpt_col = None
                     price_col = None
                     desc_col = None
-                    
-                    for col in df.columns:
+
+                    for idx, col in enumerate(header_row):
+                        if col is None:
+                            continue
                         col_lower = str(col).lower().strip()
-                        if any(x in col_lower for x in ['cpt', 'code', 'proc_cd', 'procedure', 'hcpcs']) and 'desc' not in col_lower:
-                            cpt_col = col
-                        elif any(x in col_lower for x in ['price', 'rate', 'amount', 'cost', 'fee', 'allowance', 'calc_rate']):
-                            price_col = col
-                        elif any(x in col_lower for x in ['desc', 'description', 'name']):
-                            desc_col = col
-                    
-                    if cpt_col and price_col:
+                        if _header_matches(col_lower, CPT_HEADER_TOKENS, exclude=('desc',)):
+                            cpt_col = idx
+                        elif _header_matches(col_lower, PRICE_HEADER_TOKENS):
+                            price_col = idx
+                        elif _header_matches(col_lower, DESC_HEADER_TOKENS):
+                            desc_col = idx
+
+                    if cpt_col is not None and price_col is not None:
                         found_data = True
-                        for _, row in df.iterrows():
-                            cpt_code = str(row[cpt_col]).strip()
-                            price = row[price_col]
-                            description = row[desc_col] if desc_col else "No description"
-                            
-                            if pd.isna(cpt_code) or cpt_code == '' or cpt_code == 'nan':
+                        for row in ws.iter_rows(min_row=2, values_only=True):
+                            if len(row) <= cpt_col:
                                 continue
-                            
+                            cpt_value = row[cpt_col]
+                            if cpt_value is None:
+                                continue
+                            cpt_code = billing_code_name(cpt_value)
+                            if cpt_code == '':
+                                continue
+
+                            price = row[price_col] if len(row) > price_col else None
                             try:
                                 price = float(price)
-                            except:
+                            except (TypeError, ValueError):
                                 price = 0.0
-                            
+
+                            description = row[desc_col] if desc_col is not None and len(row) > desc_col else None
+                            if description is None:
+                                description = "No description"
+
                             cpt_data[cpt_code] = {
                                 'description': str(description),
                                 'rates': [{
@@ -519,18 +1806,20 @@ class CPTPricingAnalyzer:
                                 }]
                             }
                         break
-                        
+
                 except Exception:
                     continue
-            
+
             if not found_data:
                 return False, "Could not identify CPT code and price columns in any sheet. Please ensure your Excel has columns like 'CPT', 'Code', 'Proc_CD' and 'Price', 'Rate', 'Fee'."
             
-            self.cpt_pricing[source_name] = cpt_data
+            self._store_cpt_pricing(source_name, cpt_data)
             return True, f"Loaded {len(cpt_data)} CPT codes from Excel."
             
         except Exception as e:
             return False, f"Error loading Excel: {str(e)}"
+        finally:
+            wb.close()
 
     def load_csv_file(self, file_path, source_name):
         """Load CPT pricing from CSV without loading entire file into memory"""
@@ -547,43 +1836,46 @@ class CPTPricingAnalyzer:
 
                 for idx, header in enumerate(headers):
                     col_lower = str(header).lower().strip()
-                    if cpt_index is None and 'desc' not in col_lower and any(x in col_lower for x in ['cpt', 'code', 'proc_cd', 'procedure', 'hcpcs']):
+                    if cpt_index is None and _header_matches(col_lower, CPT_HEADER_TOKENS, exclude=('desc',)):
                         cpt_index = idx
-                    elif price_index is None and any(x in col_lower for x in ['price', 'rate', 'amount', 'cost', 'fee', 'allowance', 'calc_rate']):
+                    elif price_index is None and _header_matches(col_lower, PRICE_HEADER_TOKENS):
                         price_index = idx
-                    elif desc_index is None and any(x in col_lower for x in ['desc', 'description', 'name']):
+                    elif desc_index is None and _header_matches(col_lower, DESC_HEADER_TOKENS):
                         desc_index = idx
 
                 if cpt_index is None or price_index is None:
                     return False, "Could not find CPT code and price columns in CSV. Please ensure headers include CPT/Code and Price/Rate."
 
+                min_width = max(cpt_index, price_index) + 1
                 cpt_data = {}
-                for row in reader:
-                    if len(row) <= max(cpt_index, price_index):
-                        continue
-                    cpt_code = str(row[cpt_index]).strip()
-                    if not cpt_code:
-                        continue
-                    price_val = row[price_index]
-                    try:
-                        price = float(price_val)
-                    except (TypeError, ValueError):
-                        price = 0.0
-                    description = str(row[desc_index]).strip() if desc_index is not None and len(row) > desc_index else 'No description'
-
-                    cpt_data[cpt_code] = {
-                        'description': description,
-                        'rates': [{
-                            'billing_class': 'csv_import',
-                            'negotiated_rate': price,
-                            'billing_code_modifier': [],
-                            'service_code': [],
-                            'negotiated_type': 'csv_import',
-                            'expiration_date': None
-                        }]
-                    }
+                # Only containers that are never cyclic are allocated below; keep the
+                # cyclic GC from rescanning them every few thousand rows.
+                with gc_paused():
+                    for row in reader:
+                        if len(row) < min_width:
+                            continue
+                        cpt_code = billing_code_name(row[cpt_index])
+                        if not cpt_code:
+                            continue
+                        try:
+                            price = float(row[price_index])
+                        except (TypeError, ValueError):
+                            price = 0.0
+                        description = row[desc_index].strip() if desc_index is not None and len(row) > desc_index else 'No description'
+
+                        cpt_data[cpt_code] = {
+                            'description': description,
+                            'rates': [{
+                                'billing_class': 'csv_import',
+                                'negotiated_rate': price,
+                                'billing_code_modifier': [],
+                                'service_code': [],
+                                'negotiated_type': 'csv_import',
+                                'expiration_date': None
+                            }]
+                        }
 
-            self.cpt_pricing[source_name] = cpt_data
+            self._store_cpt_pricing(source_name, cpt_data)
             return True, f"Loaded {len(cpt_data)} CPT codes from CSV.", cpt_data
         except Exception as e:
             return False, f"Error loading CSV: {str(e)}", {}
@@ -593,33 +1885,106 @@ class CPTPricingAnalyzer:
         ext = os.path.splitext(file_storage.filename or 'upload')[1]
         safe_name = f"{prefix}_{uuid.uuid4().hex}{ext}"
         dest_path = os.path.join(self.upload_dir, safe_name)
-        file_storage.stream.seek(0)
+        src = file_storage.stream
+        src.seek(0)
         with open(dest_path, 'wb') as dest:
-            shutil.copyfileobj(file_storage.stream, dest)
-        file_storage.stream.seek(0)
+            if not self._sendfile_upload(src, dest):
+                dest.seek(0)
+                dest.truncate()
+                src.seek(0)
+                shutil.copyfileobj(src, dest, length=UPLOAD_COPY_BUFFER)
+        src.seek(0)
         return dest_path
 
+    def _sendfile_upload(self, src, dest):
+        """Copy a disk-backed upload with os.sendfile (kernel-side, no Python buffers). False if not applicable."""
+        if not hasattr(os, 'sendfile'):
+            return False
+        try:
+            src.flush()
+            src_fd = src.fileno()
+        except (AttributeError, OSError, ValueError):
+            return False  # in-memory upload (BytesIO): nothing to hand to the kernel
+        try:
+            size = os.fstat(src_fd).st_size
+            dest_fd = dest.fileno()
+            if size and hasattr(os, 'posix_fallocate'):
+                try:
+                    os.posix_fallocate(dest_fd, 0, size)
+                except OSError:
+                    pass
+            offset = 0
+            while offset < size:
+                sent = os.sendfile(dest_fd, src_fd, offset, size - offset)
+                if sent == 0:
+                    break
+                offset += sent
+            return offset == size
+        except OSError:
+            return False
+
     def add_multipart_part(self, session_id, file_storage, source_name):
         """Store a single part in a multi-part session"""
         if not session_id:
             session_id = uuid.uuid4().hex
-        if session_id not in self.multipart_sessions:
-            self.multipart_sessions[session_id] = {
+        session = self.multipart_sessions.get(session_id)
+        if session is None:
+            session = {
                 'paths': [],
                 'source_name': source_name or f'Source_{session_id[:6]}',
                 'filenames': set()
             }
+            self.multipart_sessions[session_id] = session
 
         original_name = os.path.basename(file_storage.filename or '').strip()
-        if original_name and original_name in self.multipart_sessions[session_id]['filenames']:
+        if original_name and original_name in session['filenames']:
             # Ignore duplicates to prevent double-counting during incremental uploads
-            return session_id, None, len(self.multipart_sessions[session_id]['paths']), True, original_name
+            return session_id, None, len(session['paths']), True, original_name
 
         part_path = self.save_uploaded_file(file_storage, f'part_{session_id}')
-        self.multipart_sessions[session_id]['paths'].append(part_path)
+        session['paths'].append(part_path)
         if original_name:
-            self.multipart_sessions[session_id]['filenames'].add(original_name)
-        return session_id, part_path, len(self.multipart_sessions[session_id]['paths']), False, original_name
+            session['filenames'].add(original_name)
+        return session_id, part_path, len(session['paths']), False, original_name
+
+    def submit_comparison_job(self, build_payload, *args):
+        """Run build_payload(*args) in the background; returns its job_id, or None when full."""
+        with self._comparison_jobs_lock:
+            self._expire_comparison_jobs()
+            # Make room by forgetting the oldest finished jobs; running ones stay until they finish.
+            excess = len(self.comparison_jobs) - self.comparison_job_limit + 1
+            if excess > 0:
+                for old_id in [key for key, (_, future) in self.comparison_jobs.items() if future.done()][:excess]:
+                    del self.comparison_jobs[old_id]
+            if len(self.comparison_jobs) >= self.comparison_job_limit:
+                return None
+            job_id = uuid.uuid4().hex
+            self.comparison_jobs[job_id] = (time.monotonic(), self._comparison_executor.submit(build_payload, *args))
+        return job_id
+
+    def _expire_comparison_jobs(self):
+        """Drop finished jobs older than comparison_job_ttl. Caller holds _comparison_jobs_lock."""
+        cutoff = time.monotonic() - self.comparison_job_ttl
+        for old_id in [key for key, (submitted_at, future) in self.comparison_jobs.items()
+                       if submitted_at < cutoff and future.done()]:
+            del self.comparison_jobs[old_id]
+
+    def comparison_job_payload(self, job_id):
+        """Status payload for a job, forgotten once it is returned finished. None for an unknown job_id."""
+        with self._comparison_jobs_lock:
+            self._expire_comparison_jobs()
+            item = self.comparison_jobs.get(job_id)
+            if item is None:
+                return None
+            future = item[1]
+            if not future.done():
+                return {'success': True, 'job_id': job_id, 'status': 'running'}
+            del self.comparison_jobs[job_id]
+        try:
+            payload = future.result()
+        except Exception as e:
+            payload = {'success': False, 'message': str(e)}
+        return dict(payload, job_id=job_id, status='done')
 
     def get_multipart_paths(self, session_id):
         session = self.multipart_sessions.get(session_id)
@@ -649,20 +2014,36 @@ class CPTPricingAnalyzer:
 
         return comparison
 
-    def _persist_incremental_session_summary(self, state):
+    def _persist_incremental_session_summary(self, state, payload=None, force=False):
+        """Write the session's JSON summary when due or forced; returns the path, or None if deferred."""
+        parts = state.get('parts_processed', 0)
+        now = time.monotonic()
+        if not force and state.get('persisted_parts') is not None:
+            if (parts - state['persisted_parts'] < self.incremental_persist_every
+                    and now - state.get('persisted_at', 0.0) < self.incremental_persist_interval):
+                return None
+
         safe_session_id = state.get('session_id') or uuid.uuid4().hex
         path = os.path.join(self.comparison_session_dir, f'{safe_session_id}.json')
 
-        payload = self._incremental_state_to_payload(state)
+        payload = dict(payload if payload is not None else self._incremental_state_to_payload(state))
         # Remove potentially large arrays if someone cranks limits.
         payload['meta'] = {
             'note': 'This is a saved summary + samples. Full per-code results are not stored.',
         }
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump(payload, f, ensure_ascii=False)
+        with open(path, 'wb') as f:
+            f.write(json_dumps_bytes(payload))
 
+        state['persisted_parts'] = parts
+        state['persisted_at'] = now
         return path
 
+    def flush_incremental_session_summary(self, state):
+        """Write the session's summary now if parts were compared since the last write."""
+        if state and state.get('persisted_parts') != state.get('parts_processed', 0):
+            return self._persist_incremental_session_summary(state, force=True)
+        return None
+
     def _get_or_create_incremental_session(self, session_id, source1_name, baseline_source_name):
         if not session_id:
             session_id = uuid.uuid4().hex
@@ -672,6 +2053,20 @@ class CPTPricingAnalyzer:
             if existing.get('baseline_source') != baseline_source_name:
                 raise ValueError('baseline_source cannot change for an existing session_id.')
 
+            if isinstance(existing['sample_by_bucket'], dict):
+                # Spilled by an older build that keyed buckets by name; switch to bucket ids.
+                existing['sample_by_bucket'] = [existing['sample_by_bucket'][name] for name in BUCKETS]
+                for map_name in ('code_bucket', 'code_class_bucket'):
+                    existing[map_name] = {k: BUCKET_IDS[v] for k, v in existing[map_name].items()}
+
+            if any(isinstance(k, str) for k in existing['matched_code_classes']):
+                # Older builds keyed all_classes pairs as f"{code}|{billing_class}".
+                split = lambda k: tuple(k.rsplit('|', 1)) if isinstance(k, str) else k
+                existing['matched_code_classes'] = {split(k) for k in existing['matched_code_classes']}
+                for map_name in ('code_class_bucket', 'code_class_diff_cache'):
+                    existing[map_name] = {split(k): v for k, v in existing[map_name].items()}
+                existing['sample_by_bucket'] = [{split(k): v for k, v in samples.items()} for samples in existing['sample_by_bucket']]
+
             # Update friendly name if provided
             if source1_name:
                 existing['comparison']['source1'] = source1_name
@@ -690,17 +2085,13 @@ class CPTPricingAnalyzer:
             'only_in_source1_codes': set(),
             'baseline_rate_cache': {},
             'source1_rate_summary': {},  # code -> per-rule streaming summary
-            'code_bucket': {},  # code -> 'higher_in_source1'|'higher_in_source2'|'equal'
+            'code_bucket': {},  # code -> bucket id into BUCKETS
             'code_diff_cache': {},  # code -> (source1_avg - source2_avg)
-            'code_class_bucket': {},  # f"{code}|{billing_class}" -> bucket (all_classes)
-            'code_class_diff_cache': {},  # f"{code}|{billing_class}" -> diff
-            'matched_code_classes': set(),  # set of f"{code}|{billing_class}"
+            'code_class_bucket': {},  # (code, billing_class) -> bucket id (all_classes)
+            'code_class_diff_cache': {},  # (code, billing_class) -> diff
+            'matched_code_classes': set(),  # set of (code, billing_class)
             'occurrence_counter': 0,
-            'sample_by_bucket': {
-                'higher_in_source1': {},
-                'higher_in_source2': {},
-                'equal': {}
-            },
+            'sample_by_bucket': [{}, {}, {}],  # per bucket id: key -> comparison item
             'comparison': {
                 'source1': source1_name or 'Source 1 (parts)',
                 'source2': baseline_source_name,
@@ -733,7 +2124,8 @@ class CPTPricingAnalyzer:
         if rule == 'avg':
             return {'description': description, 'sum': 0.0, 'count': 0}
         if rule == 'median':
-            return {'description': description, 'p2': self._P2Quantile(0.5), 'count': 0}
+            # Exact values until the stream outgrows streaming_median_exact_limit, then the log-bucket sketch.
+            return {'description': description, 'values': [], 'sketch': None, 'count': 0}
         if rule == 'all_classes':
             return {'description': description, 'classes': {}}
         if rule == 'max_avg_by_billing_class':
@@ -742,42 +2134,69 @@ class CPTPricingAnalyzer:
             return {'description': description}
         raise ValueError('Unsupported compare_rule for streaming mode.')
 
-    def _update_source1_summary(self, summary, price, rule):
+    def _update_source1_summary_many(self, summary, prices, rule):
+        """Fold a batch of negotiated prices (one MRF item's) into a per-code summary."""
         rule = (rule or 'max').strip().lower()
-        rate_val = self._try_float(price.get('negotiated_rate', 0))
-        billing_class = (price.get('billing_class') or 'unknown').strip() or 'unknown'
+        try_float = self._try_float
 
-        if rule == 'max':
-            if rate_val is not None:
-                summary['count'] += 1
-                if rate_val > summary.get('max', 0.0):
-                    summary['max'] = rate_val
-                    summary['billing_class'] = billing_class
-            return
+        if rule in ('max', 'min', 'avg', 'median'):
+            kept = []
+            values = []
+            for price in prices:
+                rate_val = try_float(price.get('negotiated_rate', 0))
+                if rate_val is not None:
+                    kept.append(price)
+                    values.append(rate_val)
+            if not values:
+                return
+            summary['count'] += len(values)
 
-        if rule == 'min':
-            if rate_val is not None:
-                summary['count'] += 1
-                if summary.get('min') is None or rate_val < summary.get('min'):
-                    summary['min'] = rate_val
-                    summary['billing_class'] = billing_class
-            return
+            if rule == 'max':
+                best = max(values)
+                if best > summary.get('max', 0.0):
+                    summary['max'] = best
+                    summary['billing_class'] = billing_class_name(kept[values.index(best)].get('billing_class'))
+                return
 
-        if rule == 'avg':
-            if rate_val is not None:
-                summary['sum'] += rate_val
-                summary['count'] += 1
+            if rule == 'min':
+                best = min(values)
+                if summary.get('min') is None or best < summary.get('min'):
+                    summary['min'] = best
+                    summary['billing_class'] = billing_class_name(kept[values.index(best)].get('billing_class'))
+                return
+
+            if rule == 'avg':
+                total = summary['sum']
+                for rate_val in values:  # sequential adds keep the historical rounding
+                    total += rate_val
+                summary['sum'] = total
+                return
+
+            self._add_median_values(summary, values)
             return
 
-        if rule == 'median':
-            if rate_val is not None:
-                summary['count'] += 1
-                p2 = summary.get('p2')
-                if not p2:
-                    p2 = self._P2Quantile(0.5)
-                    summary['p2'] = p2
-                p2.add(rate_val)
+        for price in prices:
+            self._update_class_summary(summary, price, rule)
+
+    def _add_median_values(self, summary, values):
+        """Buffer values exactly until streaming_median_exact_limit, then move the code onto a sketch."""
+        sketch = summary.get('sketch')
+        if sketch is not None:
+            sketch.add_many(values)
             return
+        buffered = summary.get('values')
+        if buffered is None:
+            buffered = summary['values'] = []
+        buffered.extend(values)
+        if len(buffered) > self.streaming_median_exact_limit:
+            sketch = self._LogBinQuantile(0.5)
+            sketch.add_many(buffered)
+            summary['sketch'] = sketch
+            summary['values'] = None
+
+    def _update_class_summary(self, summary, price, rule):
+        rate_val = self._try_float(price.get('negotiated_rate', 0))
+        billing_class = billing_class_name(price.get('billing_class'))
 
         if rule == 'max_avg_by_billing_class':
             classes = summary.setdefault('classes', {})
@@ -812,24 +2231,107 @@ class CPTPricingAnalyzer:
             count = summary.get('count', 0)
             return ((summary.get('sum', 0.0) / count) if count else 0.0), 'unknown', {'count': count}
         if rule == 'median':
-            p2 = summary.get('p2')
-            return (p2.value() if p2 else 0.0), 'unknown', {'count': summary.get('count', 0)}
+            sketch = summary.get('sketch')
+            if sketch is not None:
+                return sketch.value(), 'unknown', {'count': summary.get('count', 0)}
+            values = summary.get('values') or []
+            return self._median_rate([{'negotiated_rate': v} for v in values]), 'unknown', {'count': summary.get('count', 0)}
         if rule == 'all_classes':
             raise ValueError("compare_rule=all_classes returns multiple values; use class-wise comparison.")
         if rule == 'max_avg_by_billing_class':
-            by_class = self._rates_summary_by_class([{'negotiated_rate': v['sum'] / v['count'], 'billing_class': cls} for cls, v in (summary.get('classes') or {}).items() if v.get('count')])
+            by_class = self._summarize_classes({cls: v for cls, v in (summary.get('classes') or {}).items() if v.get('count')})
             return by_class.get('representative_avg', 0.0), by_class.get('representative_class', 'unknown'), {'classes': by_class.get('classes', {})}
         raise ValueError('Unsupported compare_rule for streaming mode.')
 
-    def incremental_compare_part(self, session_id, part_path, source1_name, baseline_source_name, compare_rule='max', negotiated_type=None, exclude_expired=False, as_of=None):
-        """Compare one split JSON part against baseline and accumulate results in-session."""
+    def _apply_bucket_batch(self, state, pending, bucket_map, diff_map, make_item):
+        """Move each key of `pending` ({key: (rate1, rate2, ref)}) into its bucket, out of its previous one."""
+        if not pending:
+            return
+        comparison = state['comparison']
+        keys = list(pending)
+        n = len(keys)
+        rate1 = np.fromiter((pending[k][0] for k in keys), dtype=np.float64, count=n)
+        rate2 = np.fromiter((pending[k][1] for k in keys), dtype=np.float64, count=n)
+        diffs = rate1 - rate2
+        # Ids index BUCKETS; 3 = not bucketed yet.
+        new_idx = (diffs > 0).astype(np.int64) - (diffs < 0) + 1
+        prev_idx = np.fromiter((bucket_map.get(k, 3) for k in keys), dtype=np.int64, count=n)
+        prev_diffs = np.fromiter((diff_map.get(k, 0.0) for k in keys), dtype=np.float64, count=n)
+
+        # Net transition per bucket: what the batch adds minus what it takes back from earlier parts.
+        delta = np.bincount(new_idx, minlength=4) - np.bincount(prev_idx, minlength=4)
+        prev_amounts = np.where(prev_idx == 2, np.maximum(prev_diffs, 0.0), np.minimum(prev_diffs, 0.0))
+        amount_delta = np.bincount(new_idx, weights=diffs, minlength=4) - np.bincount(prev_idx, weights=prev_amounts, minlength=4)
+        comparison['higher_in_source2_count'] += int(delta[0])
+        comparison['equal_count'] += int(delta[1])
+        comparison['higher_in_source1_count'] += int(delta[2])
+        comparison['total_higher_in_source1_amount'] += float(amount_delta[2])
+        comparison['total_higher_in_source2_amount'] -= float(amount_delta[0])
+
+        samples = state['sample_by_bucket']
+        limit = self.incremental_sample_limit
+        for key, idx, prev in zip(keys, new_idx.tolist(), prev_idx.tolist()):
+            rate1_val, rate2_val, ref = pending[key]
+            diff_map[key] = rate1_val - rate2_val
+            if prev != idx:
+                bucket_map[key] = idx
+                if prev != 3:
+                    samples[prev].pop(key, None)
+            bucket_samples = samples[idx]
+            if key in bucket_samples or len(bucket_samples) < limit:
+                bucket_samples[key] = make_item(ref, rate1_val, rate2_val)
+
+    def _baseline_rate_entry(self, state, code):
+        """Cached baseline stats for one code under the session's rule, computed on first use."""
+        cache = state['baseline_rate_cache']
+        entry = cache.get(code)
+        if entry is not None:
+            return entry
+        compare_rule = state['compare_rule']
+        source_code = (state['baseline_source'], code)
+        rates = state['baseline_key_map'][code].get('rates', [])
+        if compare_rule == 'all_classes':
+            max_by_class, count2 = self._max_rate_by_class_for(rates, source_code=source_code)
+            entry = {'classes': max_by_class, 'meta': {'count': count2}}
+        else:
+            # per_occurrence compares each code's highest occurrence against the baseline max.
+            rule = 'max' if compare_rule == 'per_occurrence' else compare_rule
+            rate2_val, rate2_class, rate2_meta = self._rate_for_rule(
+                rates,
+                rule,
+                negotiated_type=state['negotiated_type'],
+                exclude_expired=state['exclude_expired'],
+                as_of=state['baseline_as_of'],
+                source_code=source_code
+            )
+            entry = {'value': rate2_val, 'billing_class': rate2_class, 'meta': rate2_meta}
+        cache[code] = entry
+        return entry
+
+    def _only_in_source2_sample(self, state):
+        """First baseline codes (in baseline order) not yet matched by any part, up to the sample limit."""
+        matched = state['matched_baseline_codes']
+        limit = self.incremental_only_in_source2_sample_limit
+        sample = []
+        if limit <= 0:
+            return sample
+        for code, info in state['baseline_key_map'].items():
+            if code in matched:
+                continue
+            entry = self._baseline_rate_entry(state, code)
+            # all_classes shows a baseline-only code at its highest class max.
+            rate = entry['value'] if 'value' in entry else max(entry['classes'].values(), default=0.0)
+            sample.append({'code': code, 'description': info.get('description', ''), 'rate': rate})
+            if len(sample) >= limit:
+                break
+        return sample
+
+    def _prepare_incremental_session(self, session_id, source1_name, baseline_source_name, compare_rule, negotiated_type, exclude_expired, as_of):
+        """Fetch or create the session and pin its rule and filters: (state, None) or (None, message)."""
         if baseline_source_name not in self.cpt_pricing:
             return None, "Baseline source not loaded."
-
-        compare_rule = (compare_rule or 'max').strip().lower()
-        negotiated_type = (negotiated_type or '').strip().lower() or None
-        exclude_expired = bool(exclude_expired)
-        as_of = as_of or datetime.date.today()
+        if compare_rule not in STREAMING_COMPARE_RULES:
+            return None, "Error during incremental comparison: Unsupported compare_rule for streaming mode."
 
         try:
             session_id, state = self._get_or_create_incremental_session(session_id, source1_name, baseline_source_name)
@@ -840,9 +2342,8 @@ class CPTPricingAnalyzer:
         baseline_data = self.cpt_pricing[baseline_source_name]
         # Normalize baseline keys to strings once per session (fixes 0 matches in all_classes/per_occurrence)
         if state.get('baseline_key_map') is None:
-            state['baseline_key_map'] = {str(k).strip(): v for k, v in baseline_data.items()}
+            state['baseline_key_map'] = {billing_code_name(k): v for k, v in baseline_data.items()}
             comparison['total_source2'] = len(state['baseline_key_map'])
-        baseline_data = state['baseline_key_map']
         if state.get('compare_rule') and state.get('compare_rule') != compare_rule:
             return None, "compare_rule cannot change for an existing session_id."
         if state.get('negotiated_type') != negotiated_type and state.get('negotiated_type') is not None:
@@ -855,423 +2356,349 @@ class CPTPricingAnalyzer:
         state['exclude_expired'] = exclude_expired
         comparison['negotiated_type'] = negotiated_type or ''
         comparison['exclude_expired'] = exclude_expired
+        # Baseline rates are evaluated lazily (see _baseline_rate_entry) under the session's first as_of.
+        state.setdefault('baseline_as_of', as_of)
+        state.setdefault('compared_parts', set())
+        return state, None
+
+    def _scan_incremental_part(self, part_path, baseline_codes, compare_rule, negotiated_type, exclude_expired, as_of, summaries=None, known_only=()):
+        """Fold one part's CPT items into per-code source1 summaries, in place or as a mergeable fragment."""
+        summaries = {} if summaries is None else summaries
+        seen = set()
+        matched = {}
+        only_in_source1 = {}
+        keep_price = self._make_price_filter(negotiated_type, exclude_expired, as_of)
+        to_float = self._to_float
+        update_summary = self._update_source1_summary_many
+        per_occurrence = compare_rule == 'per_occurrence'
+        highest_price = self._occurrence_kernel(negotiated_type, exclude_expired, as_of) if per_occurrence else None
+
+        with self._open_json_stream(part_path) as stream:
+            for item in iter_in_network_items(stream):
+                billing_code = billing_code_name(item.get('billing_code'))
+                if not billing_code or item.get('billing_code_type') != 'CPT':
+                    continue
 
-        # Occurrence-based mode: compare every CPT item occurrence (no de-dupe).
-        if compare_rule == 'per_occurrence':
-            try:
-                with self._open_json_stream(part_path) as stream:
-                    parser = ijson.items(stream, 'in_network.item')
+                description1 = item.get('description', 'No description')
+                # Track unique codes (for counts), but aggregate ALL rates for that code.
+                seen.add(billing_code)
+                in_baseline = billing_code in baseline_codes
+
+                if per_occurrence:
+                    # Occurrence max within this CPT item; per code keep the highest occurrence seen so far.
+                    occ_rate, occ_class = highest_price(item)
+                    s1 = summaries.get(billing_code)
+                    if not s1:
+                        summaries[billing_code] = {
+                            'description': description1,
+                            'max': occ_rate,
+                            'billing_class': occ_class
+                        }
+                    else:
+                        if s1.get('description') in (None, '', 'No description') and description1 not in (None, '', 'No description'):
+                            s1['description'] = description1
+                        if occ_rate > to_float(s1.get('max', 0.0)):
+                            s1['max'] = occ_rate
+                            s1['billing_class'] = occ_class
+                    if not in_baseline and billing_code not in known_only and billing_code not in only_in_source1:
+                        only_in_source1[billing_code] = {
+                            'code': billing_code,
+                            'billing_class': occ_class,
+                            'description': description1,
+                            'rate': occ_rate
+                        }
+                elif in_baseline:
+                    s1 = summaries.get(billing_code)
+                    if s1 is None:
+                        s1 = summaries[billing_code] = self._init_source1_summary(description1, compare_rule)
+                    elif s1.get('description') in (None, '', 'No description') and description1 not in (None, '', 'No description'):
+                        s1['description'] = description1
+                    prices = item_prices(item)
+                    if keep_price is not None:
+                        prices = [price for price in prices if keep_price(price)]
+                    update_summary(s1, prices, compare_rule)
+                elif billing_code not in known_only and billing_code not in only_in_source1:
+                    # Best-effort sample rate from this one item (avg of negotiated_prices).
+                    item_sum = 0.0
+                    prices = item_prices(item)
+                    for price in prices:
+                        item_sum += to_float(price.get('negotiated_rate', 0))
+                    only_in_source1[billing_code] = {
+                        'code': billing_code,
+                        'description': description1,
+                        'rate': (item_sum / len(prices)) if prices else 0.0
+                    }
 
-                    for item in parser:
-                        billing_code = item.get('billing_code')
-                        billing_code = str(billing_code).strip() if billing_code is not None else ''
-                        if not billing_code or item.get('billing_code_type') != 'CPT':
-                            continue
+                if in_baseline:
+                    matched[billing_code] = None
 
-                        description1 = item.get('description', 'No description')
-
-                        if billing_code not in state['seen_source1_codes']:
-                            state['seen_source1_codes'].add(billing_code)
-                            comparison['total_source1_count'] += 1
-
-                        # Occurrence max within this CPT item
-                        occ_rate = 0.0
-                        occ_class = 'unknown'
-                        if 'negotiated_rates' in item:
-                            for rate_info in item['negotiated_rates']:
-                                if 'negotiated_prices' in rate_info:
-                                    for price in rate_info['negotiated_prices']:
-                                        if negotiated_type:
-                                            nt = (price.get('negotiated_type') or '').strip().lower()
-                                            if nt != negotiated_type:
-                                                continue
-                                        if exclude_expired:
-                                            exp = self._parse_date_yyyy_mm_dd(price.get('expiration_date'))
-                                            if exp is not None and exp < as_of:
-                                                continue
-                                        val = self._to_float(price.get('negotiated_rate', 0))
-                                        if val > occ_rate:
-                                            occ_rate = val
-                                            occ_class = (price.get('billing_class') or 'unknown').strip() or 'unknown'
-
-                        # Aggregate by code: keep only the highest occurrence observed so far
-                        s1 = state['source1_rate_summary'].get(billing_code)
-                        if not s1:
-                            state['source1_rate_summary'][billing_code] = {
-                                'description': description1,
-                                'max': occ_rate,
-                                'billing_class': occ_class
-                            }
-                        else:
-                            if s1.get('description') in (None, '', 'No description') and description1 not in (None, '', 'No description'):
-                                s1['description'] = description1
-                            if occ_rate > self._to_float(s1.get('max', 0.0)):
-                                s1['max'] = occ_rate
-                                s1['billing_class'] = occ_class
-
-                        if billing_code not in baseline_data:
-                            if billing_code not in state['only_in_source1_codes']:
-                                state['only_in_source1_codes'].add(billing_code)
-                                comparison['only_in_source1_count'] += 1
-                                if len(comparison['only_in_source1_sample']) < self.incremental_only_in_source1_sample_limit:
-                                    comparison['only_in_source1_sample'].append({
-                                        'code': billing_code,
-                                        'billing_class': occ_class,
-                                        'description': description1,
-                                        'rate': occ_rate
-                                    })
-                            continue
+        return {'summaries': summaries, 'seen': seen, 'matched': matched, 'only_in_source1': only_in_source1}
 
-                        state['matched_baseline_codes'].add(billing_code)
-                        comparison['total_compared'] = len(state['matched_baseline_codes'])
-
-                        if billing_code not in state['baseline_rate_cache']:
-                            rate2_val, rate2_class, rate2_meta = self._rate_for_rule(
-                                baseline_data[billing_code].get('rates', []),
-                                'max',
-                                negotiated_type=negotiated_type,
-                                exclude_expired=exclude_expired,
-                                as_of=as_of
-                            )
-                            state['baseline_rate_cache'][billing_code] = {
-                                'value': rate2_val,
-                                'billing_class': rate2_class,
-                                'meta': rate2_meta
-                            }
-                        baseline_stats = state['baseline_rate_cache'][billing_code]
-                        rate2_val = baseline_stats.get('value', 0.0)
-                        description2 = baseline_data[billing_code].get('description', '')
+    def _merge_source1_summary(self, dst, src, rule):
+        """Fold `src`, a summary of a later stretch of the stream, into `dst` as if its prices had followed."""
+        if dst.get('description') in (None, '', 'No description') and src.get('description') not in (None, '', 'No description'):
+            dst['description'] = src['description']
+
+        if rule == 'per_occurrence':
+            if src['max'] > dst['max']:
+                dst['max'] = src['max']
+                dst['billing_class'] = src['billing_class']
+            return
+
+        if rule in ('max', 'min', 'avg', 'median'):
+            dst['count'] += src['count']
+        if rule == 'max':
+            if src['max'] > dst['max']:
+                dst['max'] = src['max']
+                dst['billing_class'] = src['billing_class']
+        elif rule == 'min':
+            if src['min'] is not None and (dst['min'] is None or src['min'] < dst['min']):
+                dst['min'] = src['min']
+                dst['billing_class'] = src['billing_class']
+        elif rule == 'avg':
+            dst['sum'] += src['sum']
+        elif rule == 'median':
+            src_sketch = src.get('sketch')
+            if src_sketch is None:
+                self._add_median_values(dst, src.get('values') or [])
+            else:
+                if dst.get('sketch') is None:
+                    dst['sketch'] = self._LogBinQuantile(0.5)
+                    dst['sketch'].add_many(dst.get('values') or [])
+                    dst['values'] = None
+                dst['sketch'].merge(src_sketch)
+        elif rule == 'max_avg_by_billing_class':
+            classes = dst.setdefault('classes', {})
+            for cls, entry in (src.get('classes') or {}).items():
+                target = classes.get(cls)
+                if target is None:
+                    classes[cls] = dict(entry)
+                    continue
+                target['sum'] += entry['sum']
+                target['count'] += entry['count']
+                if entry['min'] is not None and (target['min'] is None or entry['min'] < target['min']):
+                    target['min'] = entry['min']
+                if entry['max'] is not None and (target['max'] is None or entry['max'] > target['max']):
+                    target['max'] = entry['max']
+        elif rule == 'all_classes':
+            classes = dst.setdefault('classes', {})
+            for cls, entry in (src.get('classes') or {}).items():
+                target = classes.get(cls)
+                if target is None:
+                    classes[cls] = dict(entry)
+                    continue
+                target['count'] += entry['count']
+                if entry['max'] > target.get('max', 0.0):
+                    target['max'] = entry['max']
+        else:
+            raise ValueError('Unsupported compare_rule for streaming mode.')
+
+    def _merge_incremental_fragment(self, state, fragment, touched):
+        """Fold one part's scan result into the session; matched codes are appended to `touched` in order."""
+        comparison = state['comparison']
+        summaries = state['source1_rate_summary']
+        if fragment['summaries'] is not summaries:
+            rule = state['compare_rule']
+            for code, summary in fragment['summaries'].items():
+                existing = summaries.get(code)
+                if existing is None:
+                    summaries[code] = summary
+                else:
+                    self._merge_source1_summary(existing, summary, rule)
 
-                        s1 = state['source1_rate_summary'][billing_code]
-                        rate1_val = self._to_float(s1.get('max', 0.0))
+        seen = state['seen_source1_codes']
+        seen_before = len(seen)
+        seen |= fragment['seen']
+        comparison['total_source1_count'] += len(seen) - seen_before
+
+        only_in_source1 = state['only_in_source1_codes']
+        sample = comparison['only_in_source1_sample']
+        for code, entry in fragment['only_in_source1'].items():
+            if code in only_in_source1:
+                continue
+            only_in_source1.add(code)
+            comparison['only_in_source1_count'] += 1
+            if len(sample) < self.incremental_only_in_source1_sample_limit:
+                sample.append(entry)
+
+        state['matched_baseline_codes'].update(fragment['matched'])
+        touched.update(fragment['matched'])
+
+    def _bucket_touched_codes(self, state, touched):
+        """Re-bucket every code (all_classes: code-class pair) whose source1 summary changed."""
+        comparison = state['comparison']
+        compare_rule = state['compare_rule']
+        baseline_data = state['baseline_key_map']
+        summaries = state['source1_rate_summary']
+        baseline_entry = functools.partial(self._baseline_rate_entry, state)
+        to_float = self._to_float
+        pending = {}
 
-                        diff = abs(rate1_val - rate2_val)
-                        percent_diff = (diff / max(rate1_val, rate2_val) * 100) if max(rate1_val, rate2_val) > 0 else 0
+        if compare_rule == 'per_occurrence':
+            def make_item(billing_code, rate1_val, rate2_val):
+                s1 = summaries[billing_code]
+                _, difference, percent_diff = classify_rates(rate1_val, rate2_val)
+                return {
+                    'code': billing_code,
+                    'billing_class': s1.get('billing_class', 'unknown'),
+                    'source1_description': s1.get('description', ''),
+                    'source2_description': baseline_data[billing_code].get('description', ''),
+                    'source1_rate': rate1_val,
+                    'source2_rate': rate2_val,
+                    'difference': difference,
+                    'percent_difference': percent_diff,
+                    'rate_basis': 'per_code_highest_occurrence_vs_baseline_max'
+                }
 
-                        comp_item = {
-                            'code': billing_code,
-                            'billing_class': s1.get('billing_class', 'unknown'),
-                            'source1_description': s1.get('description', description1),
-                            'source2_description': description2,
-                            'source1_rate': rate1_val,
-                            'source2_rate': rate2_val,
-                            'difference': rate1_val - rate2_val,
-                            'percent_difference': percent_diff,
-                            'rate_basis': 'per_code_highest_occurrence_vs_baseline_max'
-                        }
+            comparison['total_compared'] = len(state['matched_baseline_codes'])
+            for billing_code in touched:
+                rate1_val = to_float(summaries[billing_code].get('max', 0.0))
+                pending[billing_code] = (rate1_val, baseline_entry(billing_code).get('value', 0.0), billing_code)
+            self._apply_bucket_batch(state, pending, state['code_bucket'], state['code_diff_cache'], make_item)
+            return
 
-                        prev_bucket = state['code_bucket'].get(billing_code)
-                        prev_diff = state['code_diff_cache'].get(billing_code, 0.0)
-                        if prev_bucket == 'higher_in_source1':
-                            comparison['higher_in_source1_count'] -= 1
-                            comparison['total_higher_in_source1_amount'] -= max(prev_diff, 0.0)
-                        elif prev_bucket == 'higher_in_source2':
-                            comparison['higher_in_source2_count'] -= 1
-                            comparison['total_higher_in_source2_amount'] -= max(-prev_diff, 0.0)
-                        elif prev_bucket == 'equal':
-                            comparison['equal_count'] -= 1
-
-                        if rate1_val > rate2_val:
-                            bucket = 'higher_in_source1'
-                            comparison['higher_in_source1_count'] += 1
-                            comparison['total_higher_in_source1_amount'] += (rate1_val - rate2_val)
-                        elif rate2_val > rate1_val:
-                            bucket = 'higher_in_source2'
-                            comparison['higher_in_source2_count'] += 1
-                            comparison['total_higher_in_source2_amount'] += (rate2_val - rate1_val)
-                        else:
-                            bucket = 'equal'
-                            comparison['equal_count'] += 1
-
-                        state['code_bucket'][billing_code] = bucket
-                        state['code_diff_cache'][billing_code] = (rate1_val - rate2_val)
-
-                        for bucket_name in ('higher_in_source1', 'higher_in_source2', 'equal'):
-                            if billing_code in state['sample_by_bucket'][bucket_name] and bucket_name != bucket:
-                                del state['sample_by_bucket'][bucket_name][billing_code]
-                        if billing_code in state['sample_by_bucket'][bucket]:
-                            state['sample_by_bucket'][bucket][billing_code] = comp_item
-                        elif len(state['sample_by_bucket'][bucket]) < self.incremental_sample_limit:
-                            state['sample_by_bucket'][bucket][billing_code] = comp_item
-            except Exception as e:
-                return None, f"Error during incremental comparison: {str(e)}"
+        if compare_rule == 'all_classes':
+            def make_item(ref, rate1_val, rate2_val):
+                billing_code, cls = ref
+                _, difference, percent_diff = classify_rates(rate1_val, rate2_val)
+                return {
+                    'code': billing_code,
+                    'billing_class': cls,
+                    'source1_description': summaries[billing_code].get('description', ''),
+                    'source2_description': baseline_data[billing_code]['description'],
+                    'source1_rate': rate1_val,
+                    'source2_rate': rate2_val,
+                    'difference': difference,
+                    'percent_difference': percent_diff,
+                    'rate_basis': 'all_classes_max'
+                }
 
-            comparison['higher_in_source1'] = list(state['sample_by_bucket']['higher_in_source1'].values())
-            comparison['higher_in_source2'] = list(state['sample_by_bucket']['higher_in_source2'].values())
-            comparison['equal'] = list(state['sample_by_bucket']['equal'].values())
+            # total_compared counts code-class pairs that exist in both sources.
+            matched_classes = state['matched_code_classes']
+            for billing_code in touched:
+                s1 = summaries[billing_code]
+                s2_classes = baseline_entry(billing_code).get('classes') or {}
+                for cls, s1_entry in (s1.get('classes') or {}).items():
+                    s2_val = s2_classes.get(cls)
+                    if s2_val is None:
+                        continue
+                    key = (billing_code, cls)
+                    matched_classes.add(key)
+                    pending[key] = (to_float(s1_entry.get('max', 0.0)), to_float(s2_val), key)
+            comparison['total_compared'] = len(matched_classes)
+            self._apply_bucket_batch(state, pending, state['code_class_bucket'], state['code_class_diff_cache'], make_item)
+            return
 
-            comparison['only_in_source2_count'] = max(0, len(baseline_data) - len(state['matched_baseline_codes']))
-            comparison['only_in_source2_sample'] = []
-            for code, info in baseline_data.items():
-                if code in state['matched_baseline_codes']:
-                    continue
-                rate2_val, _, _ = self._rate_for_rule(
-                    info.get('rates', []),
-                    'max',
-                    negotiated_type=negotiated_type,
-                    exclude_expired=exclude_expired,
-                    as_of=as_of
-                )
-                comparison['only_in_source2_sample'].append({
-                    'code': code,
-                    'description': info.get('description', ''),
-                    'rate': rate2_val
-                })
-                if len(comparison['only_in_source2_sample']) >= self.incremental_only_in_source2_sample_limit:
-                    break
+        def make_item(ref, rate1_val, rate2_val):
+            billing_code, rate1_class, rate1_count = ref
+            baseline_stats = baseline_entry(billing_code)
+            _, difference, percent_diff = classify_rates(rate1_val, rate2_val)
+            return {
+                'code': billing_code,
+                'source1_description': summaries[billing_code].get('description', ''),
+                'source2_description': baseline_data[billing_code]['description'],
+                'source1_rate': rate1_val,
+                'source2_rate': rate2_val,
+                'difference': difference,
+                'percent_difference': percent_diff,
+                'source1_billing_class': rate1_class,
+                'source2_billing_class': baseline_stats.get('billing_class', 'unknown'),
+                'source1_rate_count': rate1_count,
+                'source2_rate_count': baseline_stats.get('meta', {}).get('count', 0),
+                'rate_basis': compare_rule
+            }
 
-            state['parts_processed'] += 1
-            state['last_part'] = os.path.basename(part_path)
-            state['updated_at'] = int(time.time())
-            self._persist_incremental_session_summary(state)
+        comparison['total_compared'] = len(state['matched_baseline_codes'])
+        for billing_code in touched:
+            rate1_val, rate1_class, rate1_meta = self._finalize_source1_value(summaries[billing_code], compare_rule)
+            pending[billing_code] = (rate1_val, baseline_entry(billing_code)['value'], (billing_code, rate1_class, rate1_meta.get('count', 0)))
+        self._apply_bucket_batch(state, pending, state['code_bucket'], state['code_diff_cache'], make_item)
 
-            return self._incremental_state_to_payload(state), "Success"
+    def _finish_incremental_update(self, state, part_paths, force_persist=False):
+        comparison = state['comparison']
+        for bucket_name, samples in zip(BUCKETS, state['sample_by_bucket']):
+            comparison[bucket_name] = list(samples.values())
 
-        try:
-            with self._open_json_stream(part_path) as stream:
-                parser = ijson.items(stream, 'in_network.item')
+        # Update baseline-only metrics (counts are accurate; sample is limited).
+        comparison['only_in_source2_count'] = max(0, len(state['baseline_key_map']) - len(state['matched_baseline_codes']))
+        comparison['only_in_source2_sample'] = self._only_in_source2_sample(state)
 
-                for item in parser:
-                    billing_code = item.get('billing_code')
-                    billing_code = str(billing_code).strip() if billing_code is not None else ''
-                    if not billing_code or item.get('billing_code_type') != 'CPT':
-                        continue
+        state['compared_parts'].update(part_paths)
+        state['parts_processed'] += len(part_paths)
+        state['last_part'] = os.path.basename(part_paths[-1])
+        state['updated_at'] = int(time.time())
+        payload = self._incremental_state_to_payload(state)
+        self._persist_incremental_session_summary(state, payload, force=force_persist)
 
-                    description1 = item.get('description', 'No description')
+        return payload
 
-                    # Track unique codes (for counts), but aggregate ALL rates for that code.
-                    if billing_code not in state['seen_source1_codes']:
-                        state['seen_source1_codes'].add(billing_code)
-                        comparison['total_source1_count'] += 1
-
-                    if billing_code in baseline_data:
-                        if billing_code not in state['source1_rate_summary']:
-                            state['source1_rate_summary'][billing_code] = self._init_source1_summary(description1, compare_rule)
-                        else:
-                            if state['source1_rate_summary'][billing_code].get('description') in (None, '', 'No description') and description1 not in (None, '', 'No description'):
-                                state['source1_rate_summary'][billing_code]['description'] = description1
-
-                        if 'negotiated_rates' in item:
-                            for rate_info in item['negotiated_rates']:
-                                if 'negotiated_prices' in rate_info:
-                                    for price in rate_info['negotiated_prices']:
-                                        if negotiated_type:
-                                            nt = (price.get('negotiated_type') or '').strip().lower()
-                                            if nt != negotiated_type:
-                                                continue
-                                        if exclude_expired:
-                                            exp = self._parse_date_yyyy_mm_dd(price.get('expiration_date'))
-                                            if exp is not None and exp < as_of:
-                                                continue
-                                        self._update_source1_summary(state['source1_rate_summary'][billing_code], price, compare_rule)
-
-                        state['matched_baseline_codes'].add(billing_code)
-                        comparison['total_compared'] = len(state['matched_baseline_codes'])
-
-                        if billing_code not in state['baseline_rate_cache']:
-                            if compare_rule == 'all_classes':
-                                max_by_class, count2 = self._max_rate_by_class(baseline_data[billing_code].get('rates', []))
-                                state['baseline_rate_cache'][billing_code] = {
-                                    'classes': max_by_class,
-                                    'meta': {'count': count2}
-                                }
-                            else:
-                                rate2_val, rate2_class, rate2_meta = self._rate_for_rule(
-                                    baseline_data[billing_code].get('rates', []),
-                                    compare_rule,
-                                    negotiated_type=negotiated_type,
-                                    exclude_expired=exclude_expired,
-                                    as_of=as_of
-                                )
-                                state['baseline_rate_cache'][billing_code] = {
-                                    'value': rate2_val,
-                                    'billing_class': rate2_class,
-                                    'meta': rate2_meta
-                                }
-                        baseline_stats = state['baseline_rate_cache'][billing_code]
-                        description2 = baseline_data[billing_code]['description']
+    def incremental_compare_part(self, session_id, part_path, source1_name, baseline_source_name, compare_rule='max', negotiated_type=None, exclude_expired=False, as_of=None):
+        """Compare one split JSON part against baseline and accumulate results in-session."""
+        compare_rule = (compare_rule or 'max').strip().lower()
+        negotiated_type = (negotiated_type or '').strip().lower() or None
+        exclude_expired = bool(exclude_expired)
+        as_of = as_of or datetime.date.today()
 
-                        s1 = state['source1_rate_summary'][billing_code]
-
-                        if compare_rule == 'all_classes':
-                            s1_classes = (s1.get('classes') or {})
-                            s2_classes = (baseline_stats.get('classes') or {})
-                            all_classes = set(s1_classes.keys()) | set(s2_classes.keys())
-
-                            # total_compared becomes number of code-class pairs that exist in both sources
-                            for cls in all_classes:
-                                key = f"{billing_code}|{cls}"
-                                s1_entry = s1_classes.get(cls)
-                                s2_val = s2_classes.get(cls)
-
-                                if s1_entry is None or s2_val is None:
-                                    continue
-
-                                rate1_val = self._to_float(s1_entry.get('max', 0.0))
-                                rate2_val = self._to_float(s2_val)
-
-                                state['matched_code_classes'].add(key)
-                                comparison['total_compared'] = len(state['matched_code_classes'])
-
-                                diff = abs(rate1_val - rate2_val)
-                                percent_diff = (diff / max(rate1_val, rate2_val) * 100) if max(rate1_val, rate2_val) > 0 else 0
-
-                                comp_item = {
-                                    'code': billing_code,
-                                    'billing_class': cls,
-                                    'source1_description': s1.get('description', description1),
-                                    'source2_description': description2,
-                                    'source1_rate': rate1_val,
-                                    'source2_rate': rate2_val,
-                                    'difference': rate1_val - rate2_val,
-                                    'percent_difference': percent_diff,
-                                    'rate_basis': 'all_classes_max'
-                                }
-
-                                prev_bucket = state['code_class_bucket'].get(key)
-                                prev_diff = state['code_class_diff_cache'].get(key, 0.0)
-                                if prev_bucket == 'higher_in_source1':
-                                    comparison['higher_in_source1_count'] -= 1
-                                    comparison['total_higher_in_source1_amount'] -= max(prev_diff, 0.0)
-                                elif prev_bucket == 'higher_in_source2':
-                                    comparison['higher_in_source2_count'] -= 1
-                                    comparison['total_higher_in_source2_amount'] -= max(-prev_diff, 0.0)
-                                elif prev_bucket == 'equal':
-                                    comparison['equal_count'] -= 1
-
-                                if rate1_val > rate2_val:
-                                    bucket = 'higher_in_source1'
-                                    comparison['higher_in_source1_count'] += 1
-                                    comparison['total_higher_in_source1_amount'] += (rate1_val - rate2_val)
-                                elif rate2_val > rate1_val:
-                                    bucket = 'higher_in_source2'
-                                    comparison['higher_in_source2_count'] += 1
-                                    comparison['total_higher_in_source2_amount'] += (rate2_val - rate1_val)
-                                else:
-                                    bucket = 'equal'
-                                    comparison['equal_count'] += 1
-
-                                state['code_class_bucket'][key] = bucket
-                                state['code_class_diff_cache'][key] = (rate1_val - rate2_val)
-
-                                for bucket_name in ('higher_in_source1', 'higher_in_source2', 'equal'):
-                                    if key in state['sample_by_bucket'][bucket_name] and bucket_name != bucket:
-                                        del state['sample_by_bucket'][bucket_name][key]
-                                if key in state['sample_by_bucket'][bucket]:
-                                    state['sample_by_bucket'][bucket][key] = comp_item
-                                elif len(state['sample_by_bucket'][bucket]) < self.incremental_sample_limit:
-                                    state['sample_by_bucket'][bucket][key] = comp_item
-                        else:
-                            rate2_val = baseline_stats['value']
-                            rate1_val, rate1_class, rate1_meta = self._finalize_source1_value(s1, compare_rule)
-
-                            diff = abs(rate1_val - rate2_val)
-                            percent_diff = (diff / max(rate1_val, rate2_val) * 100) if max(rate1_val, rate2_val) > 0 else 0
-
-                            comp_item = {
-                                'code': billing_code,
-                                'source1_description': s1.get('description', description1),
-                                'source2_description': description2,
-                                'source1_rate': rate1_val,
-                                'source2_rate': rate2_val,
-                                'difference': rate1_val - rate2_val,
-                                'percent_difference': percent_diff,
-                                'source1_billing_class': rate1_class,
-                                'source2_billing_class': baseline_stats.get('billing_class', 'unknown'),
-                                'source1_rate_count': rate1_meta.get('count', 0),
-                                'source2_rate_count': baseline_stats.get('meta', {}).get('count', 0),
-                                'rate_basis': compare_rule
-                            }
+        state, msg = self._prepare_incremental_session(session_id, source1_name, baseline_source_name, compare_rule, negotiated_type, exclude_expired, as_of)
+        if state is None:
+            return None, msg
 
-                            prev_bucket = state['code_bucket'].get(billing_code)
-                            prev_diff = state['code_diff_cache'].get(billing_code, 0.0)
-                            if prev_bucket == 'higher_in_source1':
-                                comparison['higher_in_source1_count'] -= 1
-                                comparison['total_higher_in_source1_amount'] -= max(prev_diff, 0.0)
-                            elif prev_bucket == 'higher_in_source2':
-                                comparison['higher_in_source2_count'] -= 1
-                                comparison['total_higher_in_source2_amount'] -= max(-prev_diff, 0.0)
-                            elif prev_bucket == 'equal':
-                                comparison['equal_count'] -= 1
-
-                            if rate1_val > rate2_val:
-                                bucket = 'higher_in_source1'
-                                comparison['higher_in_source1_count'] += 1
-                                comparison['total_higher_in_source1_amount'] += (rate1_val - rate2_val)
-                            elif rate2_val > rate1_val:
-                                bucket = 'higher_in_source2'
-                                comparison['higher_in_source2_count'] += 1
-                                comparison['total_higher_in_source2_amount'] += (rate2_val - rate1_val)
-                            else:
-                                bucket = 'equal'
-                                comparison['equal_count'] += 1
-
-                            state['code_bucket'][billing_code] = bucket
-                            state['code_diff_cache'][billing_code] = (rate1_val - rate2_val)
-
-                            for bucket_name in ('higher_in_source1', 'higher_in_source2', 'equal'):
-                                if billing_code in state['sample_by_bucket'][bucket_name] and bucket_name != bucket:
-                                    del state['sample_by_bucket'][bucket_name][billing_code]
-                            if billing_code in state['sample_by_bucket'][bucket]:
-                                state['sample_by_bucket'][bucket][billing_code] = comp_item
-                            elif len(state['sample_by_bucket'][bucket]) < self.incremental_sample_limit:
-                                state['sample_by_bucket'][bucket][billing_code] = comp_item
-                    else:
-                        if billing_code not in state['only_in_source1_codes']:
-                            state['only_in_source1_codes'].add(billing_code)
-                            comparison['only_in_source1_count'] += 1
-
-                            # Best-effort sample rate from this one item (avg of negotiated_prices).
-                            item_sum = 0.0
-                            item_count = 0
-                            if 'negotiated_rates' in item:
-                                for rate_info in item['negotiated_rates']:
-                                    if 'negotiated_prices' in rate_info:
-                                        for price in rate_info['negotiated_prices']:
-                                            item_sum += self._to_float(price.get('negotiated_rate', 0))
-                                            item_count += 1
-                            item_avg = (item_sum / item_count) if item_count else 0.0
-
-                            if len(comparison['only_in_source1_sample']) < self.incremental_only_in_source1_sample_limit:
-                                comparison['only_in_source1_sample'].append({
-                                    'code': billing_code,
-                                    'description': description1,
-                                    'rate': item_avg
-                                })
+        # Keys matched in this part, in first-seen order; bucketed once after the part is read.
+        touched = {}
+        try:
+            fragment = self._scan_incremental_part(
+                part_path, state['baseline_key_map'], compare_rule, negotiated_type, exclude_expired, as_of,
+                summaries=state['source1_rate_summary'], known_only=state['only_in_source1_codes']
+            )
+            self._merge_incremental_fragment(state, fragment, touched)
+            self._bucket_touched_codes(state, touched)
         except Exception as e:
             return None, f"Error during incremental comparison: {str(e)}"
 
-        comparison['higher_in_source1'] = list(state['sample_by_bucket']['higher_in_source1'].values())
-        comparison['higher_in_source2'] = list(state['sample_by_bucket']['higher_in_source2'].values())
-        comparison['equal'] = list(state['sample_by_bucket']['equal'].values())
+        return self._finish_incremental_update(state, [part_path]), "Success"
 
-        # Update baseline-only metrics (counts are accurate; sample is limited).
-        comparison['only_in_source2_count'] = max(0, len(baseline_data) - len(state['matched_baseline_codes']))
-        comparison['only_in_source2_sample'] = []
-        for code, info in baseline_data.items():
-            if code in state['matched_baseline_codes']:
-                continue
-            rate2_val, _, _ = self._rate_for_rule(
-                info.get('rates', []),
-                compare_rule,
-                negotiated_type=negotiated_type,
-                exclude_expired=exclude_expired,
-                as_of=as_of
-            )
-            comparison['only_in_source2_sample'].append({
-                'code': code,
-                'description': info['description'],
-                'rate': rate2_val
-            })
-            if len(comparison['only_in_source2_sample']) >= self.incremental_only_in_source2_sample_limit:
-                break
+    def incremental_compare_parts(self, session_id, part_paths, source1_name, baseline_source_name, compare_rule='max', negotiated_type=None, exclude_expired=False, as_of=None, max_workers=None):
+        """Compare every stored part not yet in the session, scanning them in parallel worker processes."""
+        compare_rule = (compare_rule or 'max').strip().lower()
+        negotiated_type = (negotiated_type or '').strip().lower() or None
+        exclude_expired = bool(exclude_expired)
+        as_of = as_of or datetime.date.today()
 
-        state['parts_processed'] += 1
-        state['last_part'] = os.path.basename(part_path)
-        state['updated_at'] = int(time.time())
-        self._persist_incremental_session_summary(state)
+        state, msg = self._prepare_incremental_session(session_id, source1_name, baseline_source_name, compare_rule, negotiated_type, exclude_expired, as_of)
+        if state is None:
+            return None, msg
+
+        todo = [p for p in dict.fromkeys(part_paths or []) if p not in state['compared_parts']]
+        if not todo:
+            return self._incremental_state_to_payload(state), "No new parts to compare."
+
+        workers = max(1, min(len(todo), max_workers or usable_cpus()))
+        if workers > 1 and max_workers is None:
+            # Worker start-up would cost more than a serial scan of a few small parts.
+            if sum(os.path.getsize(p) for p in todo if os.path.exists(p)) < PARALLEL_PARTS_MIN_BYTES:
+                workers = 1
+        baseline_codes = frozenset(state['baseline_key_map'])
+        scan_args = (compare_rule, negotiated_type, exclude_expired, as_of)
+        touched = {}
+        try:
+            if workers == 1:
+                for part_path in todo:
+                    self._merge_incremental_fragment(state, self._scan_incremental_part(part_path, baseline_codes, *scan_args), touched)
+            else:
+                context = multiprocessing.get_context('spawn')
+                # baseline_codes goes to each worker once, through the initializer, not with every part.
+                with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=workers, mp_context=context,
+                    initializer=_init_scan_part_worker, initargs=(baseline_codes,)
+                ) as pool:
+                    futures = [pool.submit(_scan_part_worker, part_path, *scan_args) for part_path in todo]
+                    for future in futures:
+                        self._merge_incremental_fragment(state, future.result(), touched)
+            self._bucket_touched_codes(state, touched)
+        except Exception as e:
+            return None, f"Error during incremental comparison: {str(e)}"
 
-        return self._incremental_state_to_payload(state), "Success"
+        return self._finish_incremental_update(state, todo, force_persist=True), "Success"
     
     def extract_cpt_codes_from_index(self, data):
         """Extract in-network file URLs from index JSON"""
@@ -1303,7 +2730,7 @@ class CPTPricingAnalyzer:
         in_network = data.get('in_network')
         if isinstance(in_network, list) and in_network:
             cpt_data = self.extract_cpt_pricing(data)
-            self.cpt_pricing[source_name] = cpt_data
+            self._store_cpt_pricing(source_name, cpt_data)
             base_payload = {
                 'message': f'Loaded {len(cpt_data)} CPT codes directly from in-network JSON',
                 'type': 'direct_in_network_json'
@@ -1327,7 +2754,7 @@ class CPTPricingAnalyzer:
                         'success': False,
                         'message': 'Unable to locate in_network CPT data in the large JSON file.'
                     }
-                self.cpt_pricing[source_name] = cpt_data
+                self._store_cpt_pricing(source_name, cpt_data)
                 self.data_sources[source_name] = {'source_type': 'direct_in_network_stream', 'path': path}
                 base_payload = {
                     'message': f'Loaded {len(cpt_data)} CPT codes from large JSON via streaming',
@@ -1336,7 +2763,7 @@ class CPTPricingAnalyzer:
                 return self.build_cpt_response_payload(source_name, cpt_data, base_payload)
             else:
                 with self._open_json_stream(path) as reader:
-                    data = json.load(reader)
+                    data = json_loads(reader.read())
                 self.data_sources[source_name] = data
                 return self.prepare_json_response(data, source_name)
         except Exception as e:
@@ -1357,7 +2784,7 @@ class CPTPricingAnalyzer:
                     'message': 'Unable to locate in_network CPT data in the provided parts.'
                 }
 
-            self.cpt_pricing[source_name] = cpt_data
+            self._store_cpt_pricing(source_name, cpt_data)
             self.data_sources[source_name] = {'source_type': 'direct_in_network_stream_parts', 'paths': part_paths}
             base_payload = {
                 'message': f'Loaded {len(cpt_data)} CPT codes from {len(part_paths)} parts (streamed)',
@@ -1372,8 +2799,10 @@ class CPTPricingAnalyzer:
         if isinstance(path, (list, tuple)):
             return MultiPartStream(list(path))
         if path.endswith('.gz'):
-            return gzip.open(path, 'rb')
-        return open(path, 'rb')
+            return open_gzip_file(path)
+        handle = open(path, 'rb')
+        _fadvise(handle.fileno(), 'POSIX_FADV_SEQUENTIAL')
+        return handle
 
     def extract_cpt_pricing_stream(self, stream, max_codes=None, skip_codes=0):
         """Stream large JSON files to build CPT pricing without loading entire document using ijson"""
@@ -1382,7 +2811,7 @@ class CPTPricingAnalyzer:
         skipped = 0
         
         try:
-            parser = ijson.items(stream, 'in_network.item')
+            parser = iter_in_network_items(stream)
             
             for item in parser:
                 # Skip items if pagination offset is specified
@@ -1401,13 +2830,62 @@ class CPTPricingAnalyzer:
             
         return cpt_data
     
+    def _page_cursor(self, file_path, kind, start):
+        """Parse cursor for a page starting after `start` items: the one parked by the last page, or a fresh one."""
+        cursor = self.page_cursors.pop((file_path, kind), None)
+        if cursor is not None and cursor['consumed'] > start:
+            cursor['stream'].close()
+            cursor = None
+        if cursor is None:
+            stream = self._open_json_stream(file_path)
+            cursor = {'stream': stream, 'items': iter_in_network_items(stream), 'consumed': 0}
+        return cursor
+
+    def _skip_page_items(self, cursor, start, counted):
+        """Consume items until `start` of them have satisfied counted(item)."""
+        if cursor['consumed'] < start:
+            skipped = islice(filter(counted, cursor['items']), start - cursor['consumed'])
+            cursor['consumed'] += sum(1 for _ in skipped)
+
+    def _park_page_cursor(self, file_path, kind, cursor):
+        """Keep `cursor` for the next page request, closing the least recently used beyond page_cursor_limit."""
+        self.page_cursors[(file_path, kind)] = cursor
+        while len(self.page_cursors) > self.page_cursor_limit:
+            _, evicted = self.page_cursors.popitem(last=False)
+            evicted['stream'].close()
+
+    def _discard_upload_session(self, entry):
+        """Close parked cursors on an expired upload session's file and delete the file."""
+        path = entry.get('path')
+        for key in [k for k in self.page_cursors if k[0] == path]:
+            self.page_cursors.pop(key)['stream'].close()
+        try:
+            os.remove(path)
+        except (OSError, TypeError) as e:
+            print(f"Could not remove expired upload {path}: {e}")
+
     def extract_cpt_pricing_paginated(self, file_path, page=1, page_size=500):
         """Extract CPT pricing with pagination support"""
         skip = (page - 1) * page_size
         
         try:
-            with self._open_json_stream(file_path) as stream:
-                cpt_data = self.extract_cpt_pricing_stream(stream, max_codes=page_size, skip_codes=skip)
+            cursor = self._page_cursor(file_path, 'cpt', skip)
+            cpt_data = {}
+            count = 0
+            try:
+                self._skip_page_items(cursor, skip, _counts_for_cpt_page)
+                for item in cursor['items']:
+                    if _counts_for_cpt_page(item):
+                        cursor['consumed'] += 1
+                    if self._add_cpt_entry(item, cpt_data):
+                        count += 1
+                        if count >= page_size:
+                            break
+            except Exception as e:
+                print(f"Error streaming JSON: {str(e)}")
+                cursor['stream'].close()
+            else:
+                self._park_page_cursor(file_path, 'cpt', cursor)
             
             return {
                 'success': True,
@@ -1451,65 +2929,134 @@ class CPTPricingAnalyzer:
 
         return payload
     
-    def fetch_and_parse_gzipped_json(self, url):
-        """Fetch and parse gzipped JSON file with simple caching"""
+    def _open_mrf_source(self, url):
+        """Open a URL (cached under cache_dir) or local path for streaming. Returns (stream, cache_hit)."""
         cache_hit = False
         cache_path = None
-        content = None
 
         try:
             if url.startswith('http'):
                 parsed_name = os.path.basename(url.split('?')[0]) or 'file'
-                url_hash = hashlib.sha256(url.encode()).hexdigest()[:16]
-                cache_filename = f"{url_hash}_{parsed_name}"
+                cache_filename = f"{cache_key(url)}_{parsed_name}"
                 cache_path = os.path.join(self.cache_dir, cache_filename)
+                if not os.path.exists(cache_path):
+                    # Files cached before the switch to BLAKE2b keys are still valid; adopt them.
+                    legacy_hash = hashlib.sha256(url.encode()).hexdigest()[:16]
+                    legacy_path = os.path.join(self.cache_dir, f"{legacy_hash}_{parsed_name}")
+                    if os.path.exists(legacy_path):
+                        try:
+                            os.replace(legacy_path, cache_path)
+                        except OSError:
+                            cache_path = legacy_path
 
                 if os.path.exists(cache_path):
-                    cache_hit = True
-                    with open(cache_path, 'rb') as f:
-                        content = f.read()
+                    return open(cache_path, 'rb'), True
             else:
                 if os.path.exists(url):
-                    with open(url, 'rb') as f:
-                        content = f.read()
-                else:
-                    print(f"Error: File not found - {url}")
-                    return None, cache_hit
+                    return open(url, 'rb'), cache_hit
+                print(f"Error: File not found - {url}")
+                return None, cache_hit
+
+            # The signature's own expiry answers this without a round trip; 403 below still catches the rest.
+            if signed_url_expired(url):
+                print(f"Error: URL is expired: {url}")
+                return "EXPIRED", cache_hit
+
+            response = http_session.get(url, stream=True, timeout=60)
+
+            # Check for 403 Forbidden which usually means expired link
+            if response.status_code == 403:
+                if "AccessDenied" in response.text or "Expired" in response.text:
+                    print(f"Error: URL is expired or access denied: {url}")
+                    return "EXPIRED", cache_hit
+
+            response.raise_for_status()
+            # Undo any Content-Encoding; a .json.gz body is still gzip and is sniffed by the caller.
+            response.raw.decode_content = True
+            return CachingResponseStream(response.raw, cache_path), cache_hit
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching {url}: {e}")
+            return None, cache_hit
 
-            if content is None:
-                response = requests.get(url, timeout=60)
+    def _decompressed(self, stream):
+        """`stream` itself, or a gzip reader over it when the body starts with the gzip magic."""
+        if stream.peek(2)[:2] == b'\x1f\x8b':
+            return gzip_reader(stream)
+        return stream
+
+    def _report_unparseable(self, stream):
+        print("Error: Response is neither gzipped JSON nor regular JSON")
+        if isinstance(stream, CachingResponseStream):
+            stream.discard_cache()
+            preview = stream.head
+        else:
+            try:
+                stream.seek(0)
+                preview = stream.read(100)
+            except (OSError, ValueError):
+                preview = b''
+        print(f"First 100 bytes: {preview}")
+
+    def fetch_and_parse_gzipped_json(self, url):
+        """Fetch and parse gzipped JSON file with simple caching"""
+        stream, cache_hit = self._open_mrf_source(url)
+        if stream is None or stream == "EXPIRED":
+            return stream, cache_hit
 
-                # Check for 403 Forbidden which usually means expired link
-                if response.status_code == 403:
-                    if "AccessDenied" in response.text or "Expired" in response.text:
-                        print(f"Error: URL is expired or access denied: {url}")
-                        return "EXPIRED", cache_hit
+        try:
+            with stream:
+                # The whole document is materialized anyway: read the body once and inflate it in
+                # one call rather than through a GzipFile reader.
+                body = stream.read()
+                try:
+                    if body[:2] == b'\x1f\x8b':
+                        body = gzip_impl.decompress(body)
+                    data = json_loads(body)
+                except (gzip.BadGzipFile, EOFError, zlib.error, json.JSONDecodeError):
+                    self._report_unparseable(stream)
+                    return None, cache_hit
+            return data, cache_hit
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching {url}: {e}")
+            return None, cache_hit
+        except Exception as e:
+            print(f"Unexpected error fetching {url}: {e}")
+            return None, cache_hit
 
-                response.raise_for_status()
-                content = response.content
+    def fetch_cpt_pricing(self, url, max_codes=None):
+        """fetch_and_parse_gzipped_json + extract_cpt_pricing without materializing the document."""
+        stream, cache_hit = self._open_mrf_source(url)
+        if stream is None or stream == "EXPIRED":
+            return stream, cache_hit
 
-                if cache_path:
-                    try:
-                        with open(cache_path, 'wb') as f:
-                            f.write(content)
-                    except OSError as e:
-                        print(f"Warning: Unable to write cache file {cache_path}: {e}")
+        if isinstance(stream, CachingResponseStream):
+            cache_path = stream.cache_path
+        else:
+            cache_path = stream.name if cache_hit else None
+        if cache_hit and max_codes is None:
+            cpt_data = self._load_pricing_sidecar(cache_path)
+            if cpt_data is not None:
+                stream.close()
+                return cpt_data, cache_hit
 
-            # Try to decompress as gzip first
-            try:
-                with gzip.GzipFile(fileobj=BytesIO(content)) as gz:
-                    data = json.load(gz)
-                return data, cache_hit
-            except (gzip.BadGzipFile, OSError):
-                # If not gzipped, try as regular JSON
+        cpt_data = {}
+        count = 0
+        try:
+            with stream:
                 try:
-                    data = json.loads(content)
-                    return data, cache_hit
-                except json.JSONDecodeError:
-                    print("Error: Response is neither gzipped JSON nor regular JSON")
-                    preview = content[:100] if content else b''
-                    print(f"First 100 bytes: {preview}")
+                    for item in iter_in_network_items(self._decompressed(stream)):
+                        if max_codes is not None and count >= max_codes:
+                            break
+                        if self._add_cpt_entry(item, cpt_data):
+                            count += 1
+                except (gzip.BadGzipFile, EOFError, IJSONError):
+                    self._report_unparseable(stream)
                     return None, cache_hit
+                if isinstance(stream, CachingResponseStream):
+                    stream.drain()
+            if cache_path and max_codes is None:
+                self._save_pricing_sidecar(cache_path, cpt_data)
+            return cpt_data, cache_hit
         except requests.exceptions.RequestException as e:
             print(f"Error fetching {url}: {e}")
             return None, cache_hit
@@ -1517,28 +3064,67 @@ class CPTPricingAnalyzer:
             print(f"Unexpected error fetching {url}: {e}")
             return None, cache_hit
     
+    def _load_pricing_sidecar(self, cache_path):
+        """cpt_data pickled next to a cached MRF, or None when there is none or it is stale."""
+        sidecar_path = cache_path + '.cpt.pkl'
+        try:
+            if not os.path.exists(sidecar_path):
+                return None
+            stat = os.stat(cache_path)
+            with open(sidecar_path, 'rb') as f, gc_paused():
+                sidecar = pickle.load(f)
+        except Exception as e:
+            print(f"Warning: Unable to read pricing sidecar {sidecar_path}: {e}")
+            return None
+        if (sidecar.get('version') != PRICING_SIDECAR_VERSION or sidecar.get('size') != stat.st_size
+                or sidecar.get('mtime_ns') != stat.st_mtime_ns):
+            return None
+        return sidecar['cpt_data']
+
+    def _save_pricing_sidecar(self, cache_path, cpt_data):
+        """Pickle the parsed cpt_data next to a cached MRF so the next fetch skips the JSON parse."""
+        sidecar_path = cache_path + '.cpt.pkl'
+        tmp_path = sidecar_path + '.tmp'
+        if not os.path.exists(cache_path):  # the download's cache copy was discarded
+            return
+        try:
+            stat = os.stat(cache_path)
+            with open(tmp_path, 'wb') as f:
+                pickle.dump({
+                    'version': PRICING_SIDECAR_VERSION,
+                    'size': stat.st_size,
+                    'mtime_ns': stat.st_mtime_ns,
+                    'cpt_data': cpt_data
+                }, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, sidecar_path)
+        except Exception as e:
+            print(f"Warning: Unable to write pricing sidecar {sidecar_path}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
     def _add_cpt_entry(self, item, cpt_data):
         """Add a single CPT entry into the aggregated dictionary"""
         billing_code_type = item.get('billing_code_type', '')
         billing_code = item.get('billing_code', '')
-        billing_code = str(billing_code).strip() if billing_code is not None else ''
+        billing_code = billing_code_name(billing_code)
 
         if billing_code_type != 'CPT' or not billing_code:
             return False
 
-        rates = []
-        if 'negotiated_rates' in item:
-            for rate_info in item['negotiated_rates']:
-                if 'negotiated_prices' in rate_info:
-                    for price in rate_info['negotiated_prices']:
-                        rates.append({
-                            'billing_class': price.get('billing_class', 'unknown'),
-                            'negotiated_rate': price.get('negotiated_rate', 0),
-                            'billing_code_modifier': price.get('billing_code_modifier', []),
-                            'negotiated_type': price.get('negotiated_type', ''),
-                            'expiration_date': price.get('expiration_date'),
-                            'service_code': price.get('service_code', [])
-                        })
+        # A source has only a handful of distinct classes/types/dates/modifier lists, so share one object per value.
+        rates = [
+            {
+                'billing_class': intern_str(price.get('billing_class', 'unknown')),
+                'negotiated_rate': price.get('negotiated_rate', 0),
+                'billing_code_modifier': intern_codes(price.get('billing_code_modifier', ())),
+                'negotiated_type': intern_str(price.get('negotiated_type', '')),
+                'expiration_date': intern_str(price.get('expiration_date')),
+                'service_code': intern_codes(price.get('service_code', ()))
+            }
+            for price in item_prices(item)
+        ]
 
         description = item.get('description', 'No description')
 
@@ -1570,7 +3156,28 @@ class CPTPricingAnalyzer:
         return cpt_data
     
     def compare_pricing(self, source1_name, source2_name, compare_rule='max', negotiated_type=None, exclude_expired=False, as_of=None):
-        """Compare pricing between two sources"""
+        """Compare pricing between two sources (cached in comparison_cache; treat the result as read-only)."""
+        if source1_name not in self.cpt_pricing or source2_name not in self.cpt_pricing:
+            return None
+        key = (
+            source1_name,
+            source2_name,
+            (compare_rule or 'max').strip().lower(),
+            (negotiated_type or '').strip().lower(),
+            (as_of or datetime.date.today()) if exclude_expired else None,
+        )
+        comparison = self.comparison_cache.get(key)
+        if comparison is not None:
+            self.comparison_cache.move_to_end(key)
+            return comparison
+        comparison = self._compare_pricing_uncached(source1_name, source2_name, compare_rule, negotiated_type, exclude_expired, as_of)
+        if comparison is not None:
+            self.comparison_cache[key] = comparison
+            while len(self.comparison_cache) > self.comparison_cache_limit:
+                self.comparison_cache.popitem(last=False)
+        return comparison
+
+    def _compare_pricing_uncached(self, source1_name, source2_name, compare_rule='max', negotiated_type=None, exclude_expired=False, as_of=None):
         if source1_name not in self.cpt_pricing or source2_name not in self.cpt_pricing:
             return None
         
@@ -1604,56 +3211,60 @@ class CPTPricingAnalyzer:
             'total_higher_in_source2_amount': 0
         }
         
-        # Compare common CPT codes
-        all_codes = set(source1_data.keys()) | set(source2_data.keys())
-        
-        for code in all_codes:
-            if code in source1_data and code in source2_data:
+        # Compare common CPT codes: collect both rates per code, then classify them as arrays.
+        common_codes, only1_codes, only2_codes = partition_keys(source1_data, source2_data)
+        values1 = self._source_rule_values(source1_name, compare_rule, negotiated_type, exclude_expired, as_of)
+        if values1 is not None:
+            # max / min / avg reduce over whole-source columns; no per-code rule evaluation.
+            values2 = self._source_rule_values(source2_name, compare_rule, negotiated_type, exclude_expired, as_of)
+            rates1 = [values1[code] for code in common_codes]
+            rates2 = [values2[code] for code in common_codes]
+        else:
+            rates1 = []
+            rates2 = []
+            for code in common_codes:
                 # Get average rates
-                rate1, _, _ = self._rate_for_rule(source1_data[code].get('rates', []), compare_rule, negotiated_type=negotiated_type, exclude_expired=exclude_expired, as_of=as_of)
-                rate2, _, _ = self._rate_for_rule(source2_data[code].get('rates', []), compare_rule, negotiated_type=negotiated_type, exclude_expired=exclude_expired, as_of=as_of)
-                
-                comparison['total_compared'] += 1
-                
-                diff = abs(rate1 - rate2)
-                percent_diff = (diff / max(rate1, rate2) * 100) if max(rate1, rate2) > 0 else 0
-                
-                desc1 = source1_data[code]['description']
-                desc2 = source2_data[code]['description']
-                descriptions_match = (desc1 or '').strip() == (desc2 or '').strip()
-
-                item = {
-                    'code': code,
-                    'source1_description': desc1,
-                    'source2_description': desc2,
-                    'descriptions_match': descriptions_match,
-                    'source1_rate': rate1,
-                    'source2_rate': rate2,
-                    'difference': rate1 - rate2,
-                    'percent_difference': percent_diff
-                }
-                
-                if rate1 > rate2:
-                    comparison['higher_in_source1'].append(item)
-                    comparison['total_higher_in_source1_amount'] += (rate1 - rate2)
-                elif rate2 > rate1:
-                    comparison['higher_in_source2'].append(item)
-                    comparison['total_higher_in_source2_amount'] += (rate2 - rate1)
-                else:
-                    comparison['equal'].append(item)
-                    
-            elif code in source1_data:
-                comparison['only_in_source1'].append({
-                    'code': code,
-                    'description': source1_data[code]['description'],
-                    'rate': source1_data[code]['rates'][0]['negotiated_rate'] if source1_data[code]['rates'] else 0
-                })
-            else:
-                comparison['only_in_source2'].append({
-                    'code': code,
-                    'description': source2_data[code]['description'],
-                    'rate': source2_data[code]['rates'][0]['negotiated_rate'] if source2_data[code]['rates'] else 0
-                })
+                rate1, _, _ = self._rate_for_rule(source1_data[code].get('rates', []), compare_rule, negotiated_type=negotiated_type, exclude_expired=exclude_expired, as_of=as_of, source_code=(source1_name, code))
+                rate2, _, _ = self._rate_for_rule(source2_data[code].get('rates', []), compare_rule, negotiated_type=negotiated_type, exclude_expired=exclude_expired, as_of=as_of, source_code=(source2_name, code))
+                rates1.append(rate1)
+                rates2.append(rate2)
+
+        for code in only1_codes:
+            comparison['only_in_source1'].append({
+                'code': code,
+                'description': source1_data[code]['description'],
+                'rate': source1_data[code]['rates'][0]['negotiated_rate'] if source1_data[code]['rates'] else 0
+            })
+        for code in only2_codes:
+            comparison['only_in_source2'].append({
+                'code': code,
+                'description': source2_data[code]['description'],
+                'rate': source2_data[code]['rates'][0]['negotiated_rate'] if source2_data[code]['rates'] else 0
+            })
+
+        buckets, differences, percents = classify_rate_arrays(
+            np.array(rates1, dtype=np.float64), np.array(rates2, dtype=np.float64)
+        )
+        comparison['total_compared'] = len(common_codes)
+        comparison['total_higher_in_source1_amount'] += float(differences[buckets == 2].sum())
+        comparison['total_higher_in_source2_amount'] += float(-differences[buckets == 0].sum())
+
+        bucket_lists = [comparison[name] for name in BUCKETS]
+        for code, rate1, rate2, bucket, difference, percent_diff in zip(
+            common_codes, rates1, rates2, buckets.tolist(), differences.tolist(), percents
+        ):
+            desc1 = source1_data[code]['description']
+            desc2 = source2_data[code]['description']
+            bucket_lists[bucket].append({
+                'code': code,
+                'source1_description': desc1,
+                'source2_description': desc2,
+                'descriptions_match': (desc1 or '').strip() == (desc2 or '').strip(),
+                'source1_rate': rate1,
+                'source2_rate': rate2,
+                'difference': difference,
+                'percent_difference': percent_diff
+            })
         
         return comparison
 
@@ -1668,7 +3279,7 @@ class CPTPricingAnalyzer:
         s1_lookup = {str(k).strip(): v for k, v in source1_data.items()}
         s2_lookup = {str(k).strip(): v for k, v in source2_data.items()}
 
-        all_codes = set(s1_lookup.keys()) | set(s2_lookup.keys())
+        common_codes, only1_codes, only2_codes = partition_keys(s1_lookup, s2_lookup)
 
         comparison = {
             'source1': source1_name,
@@ -1686,15 +3297,13 @@ class CPTPricingAnalyzer:
             'total_higher_in_source2_amount': 0
         }
 
-        for code in all_codes:
+        for code in chain(common_codes, only1_codes, only2_codes):
             s1 = s1_lookup.get(code)
             s2 = s2_lookup.get(code)
 
             if s1 and s2:
-                s1_rates = self._filter_rates(s1.get('rates', []), negotiated_type=negotiated_type, exclude_expired=exclude_expired, as_of=as_of)
-                s2_rates = self._filter_rates(s2.get('rates', []), negotiated_type=negotiated_type, exclude_expired=exclude_expired, as_of=as_of)
-                s1_ctx, _ = self._max_rate_by_context(s1_rates)
-                s2_ctx, _ = self._max_rate_by_context(s2_rates)
+                s1_ctx, _ = self._max_rate_by_context_for(s1.get('rates', []), negotiated_type=negotiated_type, exclude_expired=exclude_expired, as_of=as_of, source_code=(source1_name, code))
+                s2_ctx, _ = self._max_rate_by_context_for(s2.get('rates', []), negotiated_type=negotiated_type, exclude_expired=exclude_expired, as_of=as_of, source_code=(source2_name, code))
                 all_ctx = set(s1_ctx.keys()) | set(s2_ctx.keys())
 
                 for (billing_class, modifiers) in all_ctx:
@@ -1703,8 +3312,7 @@ class CPTPricingAnalyzer:
                         rate2 = self._to_float(s2_ctx[(billing_class, modifiers)])
                         comparison['total_compared'] += 1
 
-                        diff = abs(rate1 - rate2)
-                        percent_diff = (diff / max(rate1, rate2) * 100) if max(rate1, rate2) > 0 else 0
+                        bucket, difference, percent_diff = classify_rates(rate1, rate2)
 
                         item = {
                             'code': code,
@@ -1714,18 +3322,13 @@ class CPTPricingAnalyzer:
                             'source2_description': s2.get('description', ''),
                             'source1_rate': rate1,
                             'source2_rate': rate2,
-                            'difference': rate1 - rate2,
+                            'difference': difference,
                             'percent_difference': percent_diff
                         }
 
-                        if rate1 > rate2:
-                            comparison['higher_in_source1'].append(item)
-                            comparison['total_higher_in_source1_amount'] += (rate1 - rate2)
-                        elif rate2 > rate1:
-                            comparison['higher_in_source2'].append(item)
-                            comparison['total_higher_in_source2_amount'] += (rate2 - rate1)
-                        else:
-                            comparison['equal'].append(item)
+                        comparison[BUCKETS[bucket]].append(item)
+                        if bucket != 1:
+                            comparison[BUCKET_AMOUNT_KEYS[bucket]] += abs(difference)
                     elif (billing_class, modifiers) in s1_ctx:
                         comparison['only_in_source1'].append({
                             'code': code,
@@ -1743,8 +3346,7 @@ class CPTPricingAnalyzer:
                             'rate': self._to_float(s2_ctx[(billing_class, modifiers)])
                         })
             elif s1:
-                s1_rates = self._filter_rates(s1.get('rates', []), negotiated_type=negotiated_type, exclude_expired=exclude_expired, as_of=as_of)
-                s1_ctx, _ = self._max_rate_by_context(s1_rates)
+                s1_ctx, _ = self._max_rate_by_context_for(s1.get('rates', []), negotiated_type=negotiated_type, exclude_expired=exclude_expired, as_of=as_of, source_code=(source1_name, code))
                 for (billing_class, modifiers), rate in s1_ctx.items():
                     comparison['only_in_source1'].append({
                         'code': code,
@@ -1754,8 +3356,7 @@ class CPTPricingAnalyzer:
                         'rate': self._to_float(rate)
                     })
             elif s2:
-                s2_rates = self._filter_rates(s2.get('rates', []), negotiated_type=negotiated_type, exclude_expired=exclude_expired, as_of=as_of)
-                s2_ctx, _ = self._max_rate_by_context(s2_rates)
+                s2_ctx, _ = self._max_rate_by_context_for(s2.get('rates', []), negotiated_type=negotiated_type, exclude_expired=exclude_expired, as_of=as_of, source_code=(source2_name, code))
                 for (billing_class, modifiers), rate in s2_ctx.items():
                     comparison['only_in_source2'].append({
                         'code': code,
@@ -1791,33 +3392,32 @@ class CPTPricingAnalyzer:
             'total_higher_in_source2_amount': 0
         }
 
-        # Cache baseline (source2) max per code
-        baseline_max = {}
-        for code, info in source2_data.items():
-            code_str = str(code).strip()
-            rate2, _, _ = self._rate_for_rule(info.get('rates', []), 'max', negotiated_type=negotiated_type, exclude_expired=exclude_expired, as_of=as_of)
-            baseline_max[code_str] = rate2
+        # Baseline (source2) max per code and source1's max + class, each from one columnar pass
+        baseline_max = {
+            str(code).strip(): rate2
+            for code, rate2 in self._source_rule_values(source2_name, 'max', negotiated_type, exclude_expired, as_of).items()
+        }
+        source1_max = self._source_max_with_class(source1_name, negotiated_type, exclude_expired, as_of)
+        unfiltered_max1 = None
 
         for code, info in source1_data.items():
             code_str = str(code).strip()
             if code_str not in baseline_max:
+                if unfiltered_max1 is None:
+                    unfiltered_max1 = self._source_rule_values(source1_name, 'max')
                 # cannot compare occurrences; mark only-in-source1 by code (not per occurrence)
                 comparison['only_in_source1'].append({
                     'code': code_str,
                     'description': info.get('description', ''),
-                    'rate': self._max_rate_with_class(info.get('rates', [])).get('max', 0.0)
+                    'rate': unfiltered_max1[code]
                 })
                 continue
 
             rate2 = baseline_max[code_str]
-            filtered = self._filter_rates(info.get('rates', []) or [], negotiated_type=negotiated_type, exclude_expired=exclude_expired, as_of=as_of)
-            max_info = self._max_rate_with_class(filtered)
-            rate1 = max_info.get('max', 0.0)
-            billing_class = max_info.get('billing_class', 'unknown')
+            rate1, billing_class = source1_max[code]
 
             comparison['total_compared'] += 1
-            diff = abs(rate1 - rate2)
-            percent_diff = (diff / max(rate1, rate2) * 100) if max(rate1, rate2) > 0 else 0
+            bucket, difference, percent_diff = classify_rates(rate1, rate2)
 
             item = {
                 'code': code_str,
@@ -1826,18 +3426,13 @@ class CPTPricingAnalyzer:
                 'source2_description': source2_data.get(code_str, {}).get('description', ''),
                 'source1_rate': rate1,
                 'source2_rate': rate2,
-                'difference': rate1 - rate2,
+                'difference': difference,
                 'percent_difference': percent_diff
             }
 
-            if rate1 > rate2:
-                comparison['higher_in_source1'].append(item)
-                comparison['total_higher_in_source1_amount'] += (rate1 - rate2)
-            elif rate2 > rate1:
-                comparison['higher_in_source2'].append(item)
-                comparison['total_higher_in_source2_amount'] += (rate2 - rate1)
-            else:
-                comparison['equal'].append(item)
+            comparison[BUCKETS[bucket]].append(item)
+            if bucket != 1:
+                comparison[BUCKET_AMOUNT_KEYS[bucket]] += abs(difference)
 
         return comparison
 
@@ -1865,17 +3460,15 @@ class CPTPricingAnalyzer:
             'total_higher_in_source2_amount': 0
         }
 
-        all_codes = set(source1_data.keys()) | set(source2_data.keys())
+        common_codes, only1_codes, only2_codes = partition_keys(source1_data, source2_data)
 
-        for code in all_codes:
+        for code in chain(common_codes, only1_codes, only2_codes):
             s1 = source1_data.get(code)
             s2 = source2_data.get(code)
 
             if s1 and s2:
-                s1_rates = self._filter_rates(s1.get('rates', []), negotiated_type=negotiated_type, exclude_expired=exclude_expired, as_of=as_of)
-                s2_rates = self._filter_rates(s2.get('rates', []), negotiated_type=negotiated_type, exclude_expired=exclude_expired, as_of=as_of)
-                s1_classes, _ = self._max_rate_by_class(s1_rates)
-                s2_classes, _ = self._max_rate_by_class(s2_rates)
+                s1_classes, _ = self._max_rate_by_class_for(s1.get('rates', []), negotiated_type=negotiated_type, exclude_expired=exclude_expired, as_of=as_of, source_code=(source1_name, code))
+                s2_classes, _ = self._max_rate_by_class_for(s2.get('rates', []), negotiated_type=negotiated_type, exclude_expired=exclude_expired, as_of=as_of, source_code=(source2_name, code))
                 all_classes = set(s1_classes.keys()) | set(s2_classes.keys())
 
                 for cls in all_classes:
@@ -1884,8 +3477,7 @@ class CPTPricingAnalyzer:
                         rate2 = self._to_float(s2_classes[cls])
                         comparison['total_compared'] += 1
 
-                        diff = abs(rate1 - rate2)
-                        percent_diff = (diff / max(rate1, rate2) * 100) if max(rate1, rate2) > 0 else 0
+                        bucket, difference, percent_diff = classify_rates(rate1, rate2)
 
                         item = {
                             'code': code,
@@ -1894,18 +3486,13 @@ class CPTPricingAnalyzer:
                             'source2_description': s2.get('description', ''),
                             'source1_rate': rate1,
                             'source2_rate': rate2,
-                            'difference': rate1 - rate2,
+                            'difference': difference,
                             'percent_difference': percent_diff
                         }
 
-                        if rate1 > rate2:
-                            comparison['higher_in_source1'].append(item)
-                            comparison['total_higher_in_source1_amount'] += (rate1 - rate2)
-                        elif rate2 > rate1:
-                            comparison['higher_in_source2'].append(item)
-                            comparison['total_higher_in_source2_amount'] += (rate2 - rate1)
-                        else:
-                            comparison['equal'].append(item)
+                        comparison[BUCKETS[bucket]].append(item)
+                        if bucket != 1:
+                            comparison[BUCKET_AMOUNT_KEYS[bucket]] += abs(difference)
                     elif cls in s1_classes:
                         comparison['only_in_source1'].append({
                             'code': code,
@@ -1921,8 +3508,7 @@ class CPTPricingAnalyzer:
                             'rate': self._to_float(s2_classes[cls])
                         })
             elif s1:
-                s1_rates = self._filter_rates(s1.get('rates', []), negotiated_type=negotiated_type, exclude_expired=exclude_expired, as_of=as_of)
-                s1_classes, _ = self._max_rate_by_class(s1_rates)
+                s1_classes, _ = self._max_rate_by_class_for(s1.get('rates', []), negotiated_type=negotiated_type, exclude_expired=exclude_expired, as_of=as_of, source_code=(source1_name, code))
                 for cls, rate in s1_classes.items():
                     comparison['only_in_source1'].append({
                         'code': code,
@@ -1931,8 +3517,7 @@ class CPTPricingAnalyzer:
                         'rate': self._to_float(rate)
                     })
             elif s2:
-                s2_rates = self._filter_rates(s2.get('rates', []), negotiated_type=negotiated_type, exclude_expired=exclude_expired, as_of=as_of)
-                s2_classes, _ = self._max_rate_by_class(s2_rates)
+                s2_classes, _ = self._max_rate_by_class_for(s2.get('rates', []), negotiated_type=negotiated_type, exclude_expired=exclude_expired, as_of=as_of, source_code=(source2_name, code))
                 for cls, rate in s2_classes.items():
                     comparison['only_in_source2'].append({
                         'code': code,
@@ -1943,12 +3528,58 @@ class CPTPricingAnalyzer:
 
         return comparison
 
+    def sorted_codes(self, source_name):
+        """A source's CPT codes in sorted order (the CSV export order), sorted once per load."""
+        cpt_data = self.cpt_pricing[source_name]
+        return self._code_stat((source_name, None), 'sorted_codes', None, False, None, lambda: sorted(cpt_data))
+
+    def _first_rates(self, source_name):
+        """{code: first stored rate as float, 0.0 when it has none}: the baseline rate of the streaming compares."""
+        cpt_data = self.cpt_pricing[source_name]
+        return self._code_stat((source_name, None), 'first_rate', None, False, None, lambda: {
+            code: self._to_float(info['rates'][0]['negotiated_rate']) if info['rates'] else 0.0
+            for code, info in cpt_data.items()
+        })
+
+    def _first_item_rate(self, item):
+        """Rate the streaming compares use for an in_network item (first positive first price)."""
+        rate1 = 0.0
+        if 'negotiated_rates' in item:
+            for rate_info in item['negotiated_rates']:
+                if 'negotiated_prices' in rate_info:
+                    for price in rate_info['negotiated_prices']:
+                        rate1 = self._to_float(price.get('negotiated_rate', 0))
+                        break # Take first for simplicity
+                if rate1 > 0: break
+        return rate1
+
+    def _bucket_stream_matches(self, comparison, matches, rates1, rates2):
+        """Classify a streaming compare's matches in one vectorized pass. Returns (bucket ids, differences)."""
+        buckets, differences, percents = classify_rate_arrays(
+            np.array(rates1, dtype=np.float64), np.array(rates2, dtype=np.float64)
+        )
+        bucket_lists = [comparison[name] for name in BUCKETS]
+        for (code, desc1, desc2), rate1, rate2, bucket, difference, percent_diff in zip(
+            matches, rates1, rates2, buckets.tolist(), differences.tolist(), percents
+        ):
+            bucket_lists[bucket].append({
+                'code': code,
+                'source1_description': desc1,
+                'source2_description': desc2,
+                'source1_rate': rate1,
+                'source2_rate': rate2,
+                'difference': difference,
+                'percent_difference': percent_diff
+            })
+        return buckets, differences
+
     def stream_compare(self, large_file_path, baseline_source_name):
         """Compare a large file (Source 1) against a loaded baseline (Source 2) using streaming."""
         if baseline_source_name not in self.cpt_pricing:
             return None, "Baseline source not loaded."
         
         baseline_data = self.cpt_pricing[baseline_source_name]
+        baseline_rates = self._first_rates(baseline_source_name)
         
         comparison = {
             'source1': 'Large File Import',
@@ -1966,81 +3597,55 @@ class CPTPricingAnalyzer:
             'total_higher_in_source2_amount': 0
         }
         
-        # Track which codes from baseline were matched
+        # Track which codes from baseline were matched; their rates are classified after the stream
         matched_baseline_codes = set()
+        matches, rates1, rates2 = [], [], []
         
         try:
             with self._open_json_stream(large_file_path) as stream:
-                parser = ijson.items(stream, 'in_network.item')
+                parser = iter_in_network_items(stream)
                 
                 for item in parser:
                     billing_code = item.get('billing_code')
-                    billing_code = str(billing_code).strip() if billing_code is not None else ''
+                    billing_code = billing_code_name(billing_code)
                     if not billing_code or item.get('billing_code_type') != 'CPT':
                         continue
                         
                     comparison['total_source1_count'] += 1
                     
-                    # Get rate for this item from large file
-                    rate1 = 0.0
-                    if 'negotiated_rates' in item:
-                        for rate_info in item['negotiated_rates']:
-                            if 'negotiated_prices' in rate_info:
-                                for price in rate_info['negotiated_prices']:
-                                    rate1 = self._to_float(price.get('negotiated_rate', 0))
-                                    break # Take first for simplicity
-                            if rate1 > 0: break
-                    
                     description1 = item.get('description', 'No description')
                     
-                    if billing_code in baseline_data:
+                    rate2 = baseline_rates.get(billing_code)
+                    if rate2 is not None:
                         matched_baseline_codes.add(billing_code)
                         comparison['total_compared'] += 1
-                        
-                        rate2 = self._to_float(baseline_data[billing_code]['rates'][0]['negotiated_rate']) if baseline_data[billing_code]['rates'] else 0.0
-                        description2 = baseline_data[billing_code]['description']
-                        
-                        diff = abs(rate1 - rate2)
-                        percent_diff = (diff / max(rate1, rate2) * 100) if max(rate1, rate2) > 0 else 0
-                        
-                        comp_item = {
-                            'code': billing_code,
-                            'source1_description': description1,
-                            'source2_description': description2,
-                            'source1_rate': rate1,
-                            'source2_rate': rate2,
-                            'difference': rate1 - rate2,
-                            'percent_difference': percent_diff
-                        }
-                        
-                        if rate1 > rate2:
-                            comparison['higher_in_source1'].append(comp_item)
-                            comparison['total_higher_in_source1_amount'] += (rate1 - rate2)
-                        elif rate2 > rate1:
-                            comparison['higher_in_source2'].append(comp_item)
-                            comparison['total_higher_in_source2_amount'] += (rate2 - rate1)
-                        else:
-                            comparison['equal'].append(comp_item)
+                        matches.append((billing_code, description1, baseline_data[billing_code]['description']))
+                        rates1.append(self._first_item_rate(item))
+                        rates2.append(rate2)
                     else:
+                        # Only the sampled codes need a rate; the rest are just counted
                         comparison['only_in_source1_count'] += 1
                         if len(comparison['only_in_source1_sample']) < 100:
                             comparison['only_in_source1_sample'].append({
                                 'code': billing_code,
                                 'description': description1,
-                                'rate': rate1
+                                'rate': self._first_item_rate(item)
                             })
                             
         except Exception as e:
             return None, f"Error during stream comparison: {str(e)}"
+        
+        buckets, differences = self._bucket_stream_matches(comparison, matches, rates1, rates2)
+        comparison['total_higher_in_source1_amount'] += float(differences[buckets == 2].sum())
+        comparison['total_higher_in_source2_amount'] += float(-differences[buckets == 0].sum())
             
-        # Identify codes only in baseline
-        for code, info in baseline_data.items():
-            if code not in matched_baseline_codes:
-                comparison['only_in_source2'].append({
-                    'code': code,
-                    'description': info['description'],
-                    'rate': self._to_float(info['rates'][0]['negotiated_rate']) if info['rates'] else 0.0
-                })
+        # Identify codes only in baseline (in baseline order)
+        if len(matched_baseline_codes) < len(baseline_data):
+            comparison['only_in_source2'] = [
+                {'code': code, 'description': info['description'], 'rate': baseline_rates[code]}
+                for code, info in baseline_data.items()
+                if code not in matched_baseline_codes
+            ]
                 
         return comparison, "Success"
 
@@ -2050,6 +3655,7 @@ class CPTPricingAnalyzer:
             return None, "Baseline source not loaded."
         
         baseline_data = self.cpt_pricing[baseline_source_name]
+        baseline_rates = self._first_rates(baseline_source_name)
         skip = (page - 1) * page_size
         
         comparison = {
@@ -2067,50 +3673,33 @@ class CPTPricingAnalyzer:
         }
         
         try:
-            with self._open_json_stream(file_path) as stream:
-                parser = ijson.items(stream, 'in_network.item')
-                
-                skipped = 0
+            cursor = self._page_cursor(file_path, 'compare', skip)
+            try:
+                self._skip_page_items(cursor, skip, _counts_for_compare_page)
                 processed = 0
                 
-                for item in parser:
+                for item in cursor['items'] if page_size > 0 else ():
                     billing_code = item.get('billing_code')
-                    billing_code = str(billing_code).strip() if billing_code is not None else ''
+                    billing_code = billing_code_name(billing_code)
                     if not billing_code or item.get('billing_code_type') != 'CPT':
                         continue
                     
-                    # Skip to the right page
-                    if skipped < skip:
-                        skipped += 1
-                        continue
-                    
-                    # Stop after page_size records
-                    if processed >= page_size:
-                        break
-                    
+                    cursor['consumed'] += 1
                     processed += 1
                     comparison['total_in_page'] += 1
                     
                     # Get rate from large file
-                    rate1 = 0.0
-                    if 'negotiated_rates' in item:
-                        for rate_info in item['negotiated_rates']:
-                            if 'negotiated_prices' in rate_info:
-                                for price in rate_info['negotiated_prices']:
-                                    rate1 = self._to_float(price.get('negotiated_rate', 0))
-                                    break
-                            if rate1 > 0: break
+                    rate1 = self._first_item_rate(item)
                     
                     description1 = item.get('description', 'No description')
                     
-                    if billing_code in baseline_data:
+                    rate2 = baseline_rates.get(billing_code)
+                    if rate2 is not None:
                         comparison['total_compared'] += 1
                         
-                        rate2 = self._to_float(baseline_data[billing_code]['rates'][0]['negotiated_rate']) if baseline_data[billing_code]['rates'] else 0.0
                         description2 = baseline_data[billing_code]['description']
                         
-                        diff = abs(rate1 - rate2)
-                        percent_diff = (diff / max(rate1, rate2) * 100) if max(rate1, rate2) > 0 else 0
+                        bucket, difference, percent_diff = classify_rates(rate1, rate2)
                         
                         comp_item = {
                             'code': billing_code,
@@ -2118,43 +3707,79 @@ class CPTPricingAnalyzer:
                             'source2_description': description2,
                             'source1_rate': rate1,
                             'source2_rate': rate2,
-                            'difference': rate1 - rate2,
+                            'difference': difference,
                             'percent_difference': percent_diff
                         }
                         
-                        if rate1 > rate2:
-                            comparison['higher_in_source1'].append(comp_item)
-                        elif rate2 > rate1:
-                            comparison['higher_in_source2'].append(comp_item)
-                        else:
-                            comparison['equal'].append(comp_item)
+                        comparison[BUCKETS[bucket]].append(comp_item)
                     else:
                         comparison['only_in_source1'].append({
                             'code': billing_code,
                             'description': description1,
                             'rate': rate1
                         })
+                    
+                    # Stop after page_size records; the next item starts the next page
+                    if processed >= page_size:
+                        break
+            except Exception:
+                cursor['stream'].close()
+                raise
+            self._park_page_cursor(file_path, 'compare', cursor)
                         
         except Exception as e:
             return None, f"Error during paginated comparison: {str(e)}"
         
-        # Add sample of codes only in baseline (first 50)
-        baseline_only_count = 0
-        for code, info in baseline_data.items():
-            if baseline_only_count >= 50:
-                break
-            comparison['only_in_source2_sample'].append({
-                'code': code,
-                'description': info['description'],
-                'rate': self._to_float(info['rates'][0]['negotiated_rate']) if info['rates'] else 0.0
-            })
-            baseline_only_count += 1
+        # Add sample of codes only in baseline (first 50); the same for every page of this baseline
+        comparison['only_in_source2_sample'] = list(self._code_stat(
+            (baseline_source_name, None), 'page_sample', None, False, None,
+            lambda: [
+                {'code': code, 'description': info['description'], 'rate': baseline_rates[code]}
+                for code, info in islice(baseline_data.items(), 50)
+            ]
+        ))
         
         return comparison, "Success"
 
 
 analyzer = CPTPricingAnalyzer()
 
+
+_worker_baseline_codes = frozenset()  # set in each incremental_compare_parts worker process
+
+
+def _init_scan_part_worker(baseline_codes):
+    global _worker_baseline_codes
+    _worker_baseline_codes = baseline_codes
+
+
+def _scan_part_worker(part_path, compare_rule, negotiated_type, exclude_expired, as_of):
+    """ProcessPoolExecutor entry point for incremental_compare_parts: one part -> fragment."""
+    return analyzer._scan_incremental_part(part_path, _worker_baseline_codes, compare_rule, negotiated_type, exclude_expired, as_of)
+
+def _form_flag(name):
+    return (request.form.get(name) or '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def _stream_compare_payload(temp_path, baseline_source):
+    """/stream_compare_upload response payload; also run as a background comparison job."""
+    comparison, msg = analyzer.stream_compare(temp_path, baseline_source)
+    if comparison:
+        return {'success': True, 'comparison': comparison, 'message': 'Stream comparison complete.'}
+    return {'success': False, 'message': msg}
+
+
+def _multipart_compare_payload(part_paths, baseline_source, source_name):
+    """/finalize_multipart comparison payload; also run as a background comparison job."""
+    comparison, msg = analyzer.stream_compare(part_paths, baseline_source)
+    if comparison:
+        comparison['from_parts'] = True
+        comparison['part_count'] = len(part_paths)
+        comparison['success'] = True
+        comparison['source1'] = source_name
+        return comparison
+    return {'success': False, 'message': msg or 'Comparison failed.'}
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -2216,8 +3841,8 @@ def upload_file():
                 else:
                     # Too large - suggest pagination
                     # Store file for pagination
-                    file_id = hashlib.sha256(temp_path.encode()).hexdigest()[:16]
-                    analyzer.data_sources[f'_large_{file_id}'] = {
+                    file_id = secrets.token_hex(8)
+                    analyzer.large_upload_sessions[file_id] = {
                         'path': temp_path,
                         'type': 'large_json_file',
                         'source_name': source_name
@@ -2260,20 +3885,17 @@ def fetch_pricing():
         url = request.json.get('url')
         source_name = request.json.get('source_name', 'Source')
         
-        # Fetch and parse the gzipped JSON
-        data, cache_hit = analyzer.fetch_and_parse_gzipped_json(url)
+        # Fetch the gzipped JSON and extract CPT pricing while it streams in
+        cpt_data, cache_hit = analyzer.fetch_cpt_pricing(url)
         
-        if data == "EXPIRED":
+        if cpt_data == "EXPIRED":
             return jsonify({
                 'success': False, 
                 'message': 'The link has expired. These secure links usually expire after a set time. Please download a fresh index file from the insurance provider website.'
             })
-        elif data:
-            # Extract CPT pricing
-            cpt_data = analyzer.extract_cpt_pricing(data)
-            
+        elif cpt_data is not None:
             # Store for comparison
-            analyzer.cpt_pricing[source_name] = cpt_data
+            analyzer._store_cpt_pricing(source_name, cpt_data)
             
             payload = analyzer.build_cpt_response_payload(source_name, cpt_data, {
                 'type': 'fetched_in_network'
@@ -2293,14 +3915,14 @@ def load_test_data():
         source_name = request.json.get('source_name', 'Test Insurance')
         
         # Load test data from file
-        with open('test_pricing_data.json', 'r') as f:
-            data = json.load(f)
+        with open('test_pricing_data.json', 'rb') as f:
+            data = json_loads(f.read())
         
         # Extract CPT pricing
         cpt_data = analyzer.extract_cpt_pricing(data)
         
         # Store for comparison
-        analyzer.cpt_pricing[source_name] = cpt_data
+        analyzer._store_cpt_pricing(source_name, cpt_data)
         
         return jsonify({
             'success': True,
@@ -2373,14 +3995,20 @@ def stream_compare_upload():
         if not temp_path.endswith('.json') and not temp_path.endswith('.gz'):
              return jsonify({'success': False, 'message': 'Only JSON or GZIP files supported for stream comparison.'})
 
-        comparison, msg = analyzer.stream_compare(temp_path, baseline_source)
-        
-        if comparison:
+        # async=1: run on the background pool and poll /comparison_job_status
+        if _form_flag('async'):
+            job_id = analyzer.submit_comparison_job(_stream_compare_payload, temp_path, baseline_source)
+            if job_id is None:
+                return jsonify({'success': False, 'message': 'Too many comparisons are running. Please try again shortly.'}), 429
+            return jsonify({'success': True, 'job_id': job_id, 'status': 'running'}), 202
+
+        payload = _stream_compare_payload(temp_path, baseline_source)
+        if payload['success']:
             # Clean up temp file to save space? Maybe keep for a bit?
             # os.remove(temp_path) 
-            return jsonify({'success': True, 'comparison': comparison, 'message': 'Stream comparison complete.'})
-        else:
-            return jsonify({'success': False, 'message': msg})
+            # Large files give large results; send the body as it is serialized
+            return app.json.streamed_response(payload)
+        return jsonify(payload)
 
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
@@ -2394,8 +4022,7 @@ def upload_multipart_part():
         baseline_source = request.form.get('baseline_source')
         compare_rule = request.form.get('compare_rule', 'max')
         negotiated_type = (request.form.get('negotiated_type') or '').strip()
-        exclude_expired_raw = (request.form.get('exclude_expired') or '').strip().lower()
-        exclude_expired = exclude_expired_raw in ('1', 'true', 'yes', 'on')
+        exclude_expired = _form_flag('exclude_expired')
 
         if 'file' not in request.files or not request.files['file'].filename:
             return jsonify({'success': False, 'message': 'No part file uploaded.'})
@@ -2441,6 +4068,45 @@ def upload_multipart_part():
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
 
+@app.route('/compare_multipart_parts', methods=['POST'])
+def compare_multipart_parts():
+    """Compare every stored part of a multipart session against a baseline, scanning parts in parallel."""
+    try:
+        session_id = request.form.get('session_id')
+        baseline_source = request.form.get('baseline_source')
+        compare_rule = request.form.get('compare_rule', 'max')
+        negotiated_type = (request.form.get('negotiated_type') or '').strip()
+        exclude_expired = _form_flag('exclude_expired')
+
+        if not session_id or not baseline_source:
+            return jsonify({'success': False, 'message': 'session_id and baseline_source are required.'})
+
+        part_paths = analyzer.get_multipart_paths(session_id)
+        if not part_paths:
+            return jsonify({'success': False, 'message': 'No parts found for this session. Upload parts first.'})
+
+        source_name = request.form.get('source_name') or analyzer.multipart_sessions.get(session_id, {}).get('source_name')
+        comparison, msg = analyzer.incremental_compare_parts(
+            session_id=session_id,
+            part_paths=part_paths,
+            source1_name=source_name,
+            baseline_source_name=baseline_source,
+            compare_rule=compare_rule,
+            negotiated_type=negotiated_type or None,
+            exclude_expired=exclude_expired
+        )
+        if not comparison:
+            return jsonify({'success': False, 'message': msg or 'Incremental comparison failed.'})
+        return jsonify({
+            'success': True,
+            'session_id': session_id,
+            'part_count': len(part_paths),
+            'comparison': comparison,
+            'message': f'{len(part_paths)} parts compared against {baseline_source}.' if msg == 'Success' else msg
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
 @app.route('/incremental_comparison_status')
 def incremental_comparison_status():
     """Fetch the current accumulated comparison for an incremental session."""
@@ -2454,8 +4120,8 @@ def incremental_comparison_status():
         path = os.path.join(analyzer.comparison_session_dir, f'{session_id}.json')
         if os.path.exists(path):
             try:
-                with open(path, 'r', encoding='utf-8') as f:
-                    payload = json.load(f)
+                with open(path, 'rb') as f:
+                    payload = json_loads(f.read())
                 payload['success'] = True
                 return jsonify(payload)
             except Exception as e:
@@ -2466,6 +4132,20 @@ def incremental_comparison_status():
     payload['success'] = True
     return jsonify(payload)
 
+@app.route('/comparison_job_status')
+def comparison_job_status():
+    """Poll a comparison started with async=1; the finished payload is what the synchronous route returns."""
+    job_id = request.args.get('job_id')
+    if not job_id:
+        return jsonify({'success': False, 'message': 'Missing job_id'}), 400
+
+    payload = analyzer.comparison_job_payload(job_id)
+    if payload is None:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    if payload['status'] == 'done' and payload.get('success'):
+        return app.json.streamed_response(payload)
+    return jsonify(payload)
+
 @app.route('/finalize_multipart', methods=['POST'])
 def finalize_multipart():
     """
@@ -2484,6 +4164,9 @@ def finalize_multipart():
         if not part_paths:
             return jsonify({'success': False, 'message': 'No parts found for this session. Upload parts first.'})
 
+        # The upload is complete, so save any summary of per-part comparisons still pending.
+        analyzer.flush_incremental_session_summary(analyzer.incremental_compare_sessions.get(session_id))
+
         # Use stored source name if client didn't override
         if not source_name:
             source_name = analyzer.multipart_sessions.get(session_id, {}).get('source_name', f'Source_{session_id[:6]}')
@@ -2491,14 +4174,12 @@ def finalize_multipart():
         if baseline_source:
             if baseline_source not in analyzer.cpt_pricing:
                 return jsonify({'success': False, 'message': f'Baseline source \"{baseline_source}\" not loaded yet.'})
-            comparison, msg = analyzer.stream_compare(part_paths, baseline_source)
-            if comparison:
-                comparison['from_parts'] = True
-                comparison['part_count'] = len(part_paths)
-                comparison['success'] = True
-                comparison['source1'] = source_name
-                return jsonify(comparison)
-            return jsonify({'success': False, 'message': msg or 'Comparison failed.'})
+            if _form_flag('async'):
+                job_id = analyzer.submit_comparison_job(_multipart_compare_payload, part_paths, baseline_source, source_name)
+                if job_id is None:
+                    return jsonify({'success': False, 'message': 'Too many comparisons are running. Please try again shortly.'}), 429
+                return jsonify({'success': True, 'job_id': job_id, 'status': 'running'}), 202
+            return jsonify(_multipart_compare_payload(part_paths, baseline_source, source_name))
 
         # Otherwise, fully load CPT data from the combined stream
         response_payload = analyzer.load_json_from_parts(part_paths, source_name)
@@ -2517,15 +4198,15 @@ def load_paginated():
             page_size = int(request.form.get('page_size', 500))
             
             # Check if this is from /upload endpoint
-            source_key_large = f'_large_{file_id}'
-            source_key_paginated = f'_paginated_{file_id}'
-            
-            if source_key_large in analyzer.data_sources:
+            large_session = analyzer.large_upload_sessions.get(file_id)
+            paginated_session = None if large_session else analyzer.paginated_sessions.get(file_id)
+            if large_session:
                 # File uploaded via /upload, now loading paginated
-                file_path = analyzer.data_sources[source_key_large]['path']
+                analyzer.large_upload_sessions.pop(file_id)
+                file_path = large_session['path']
                 
-                # Move to paginated storage
-                analyzer.data_sources[source_key_paginated] = {
+                # Move to paginated storage (the file now belongs to the paginated entry)
+                analyzer.paginated_sessions[file_id] = {
                     'path': file_path,
                     'type': 'paginated_file'
                 }
@@ -2534,9 +4215,9 @@ def load_paginated():
                 result['file_id'] = file_id
                 return jsonify(result)
                 
-            elif source_key_paginated in analyzer.data_sources:
+            elif paginated_session:
                 # Already in paginated mode
-                file_path = analyzer.data_sources[source_key_paginated]['path']
+                file_path = paginated_session['path']
                 result = analyzer.extract_cpt_pricing_paginated(file_path, page, page_size)
                 result['file_id'] = file_id
                 return jsonify(result)
@@ -2551,8 +4232,8 @@ def load_paginated():
             
             # Store path in session or return to client
             # For simplicity, we'll use a simple in-memory cache
-            file_id = hashlib.sha256(temp_path.encode()).hexdigest()[:16]
-            analyzer.data_sources[f'_paginated_{file_id}'] = {'path': temp_path, 'type': 'paginated_file'}
+            file_id = secrets.token_hex(8)
+            analyzer.paginated_sessions[file_id] = {'path': temp_path, 'type': 'paginated_file'}
             
             page = int(request.form.get('page', 1))
             page_size = int(request.form.get('page_size', 500))
@@ -2567,11 +4248,11 @@ def load_paginated():
             page = int(request.form.get('page', 1))
             page_size = int(request.form.get('page_size', 500))
             
-            source_key = f'_paginated_{file_id}'
-            if source_key not in analyzer.data_sources:
+            paginated_session = analyzer.paginated_sessions.get(file_id)
+            if not paginated_session:
                 return jsonify({'success': False, 'message': 'File session expired. Please re-upload.'})
             
-            file_path = analyzer.data_sources[source_key]['path']
+            file_path = paginated_session['path']
             result = analyzer.extract_cpt_pricing_paginated(file_path, page, page_size)
             result['file_id'] = file_id
             return jsonify(result)
@@ -2622,8 +4303,8 @@ def compare_paginated():
             temp_path = analyzer.save_uploaded_file(file, 'compare_paginated')
             
             # Store path
-            file_id = hashlib.sha256(temp_path.encode()).hexdigest()[:16]
-            analyzer.data_sources[f'_compare_{file_id}'] = {
+            file_id = secrets.token_hex(8)
+            analyzer.compare_sessions[file_id] = {
                 'path': temp_path, 
                 'type': 'compare_paginated_file',
                 'baseline': baseline_source
@@ -2647,12 +4328,12 @@ def compare_paginated():
             page = int(request.form.get('page', 1))
             page_size = int(request.form.get('page_size', 500))
             
-            source_key = f'_compare_{file_id}'
-            if source_key not in analyzer.data_sources:
+            session = analyzer.compare_sessions.get(file_id)
+            if not session:
                 return jsonify({'success': False, 'message': 'Comparison session expired. Please re-upload.'})
             
-            file_path = analyzer.data_sources[source_key]['path']
-            baseline = analyzer.data_sources[source_key]['baseline']
+            file_path = session['path']
+            baseline = session['baseline']
             
             comparison, msg = analyzer.compare_paginated(file_path, baseline, page, page_size)
             
@@ -2675,6 +4356,62 @@ def get_sources():
         'sources': list(analyzer.data_sources.keys())
     })
 
+def csv_stream_response(rows, filename):
+    """text/csv attachment whose body is written while `rows` is iterated, in ~CSV_STREAM_FLUSH_BYTES pieces."""
+    def generate():
+        buffer = StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(row)
+            if buffer.tell() >= CSV_STREAM_FLUSH_BYTES:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    response = app.response_class(generate())
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['Content-Type'] = 'text/csv'
+    return response
+
+
+def _compared_csv_fields(item):
+    return [
+        item.get('code', ''),
+        item.get('source1_description', item.get('description', '')),
+        item.get('source2_description', ''),
+        item.get('source1_rate', item.get('rate', '')),
+        item.get('source2_rate', ''),
+        item.get('difference', 0),
+        item.get('percent_difference', 0)
+    ]
+
+
+def _only_in_source1_csv_fields(item):
+    return [item.get('code', ''), item.get('description', ''), '', item.get('rate', ''), '', '', '']
+
+
+def _only_in_source2_csv_fields(item):
+    return [item.get('code', ''), '', item.get('description', ''), '', item.get('rate', ''), '', '']
+
+
+def _comparison_csv_rows(comparison, source1, source2, include_only=False):
+    """Numbered detail rows shared by the comparison exports: the rate buckets, then (include_only) one-source codes."""
+    buckets = [
+        ('higher_in_source1', f'Higher in {source1}', _compared_csv_fields),
+        ('higher_in_source2', f'Higher in {source2}', _compared_csv_fields),
+        ('equal', 'Equal Pricing', _compared_csv_fields),
+    ]
+    if include_only:
+        buckets.append(('only_in_source1', f'Only in {source1}', _only_in_source1_csv_fields))
+        buckets.append(('only_in_source2', f'Only in {source2}', _only_in_source2_csv_fields))
+    tagged = chain.from_iterable(
+        ((bucket_label, fields, item) for item in comparison.get(key, []))
+        for key, bucket_label, fields in buckets
+    )
+    for serial, (bucket_label, fields, item) in enumerate(tagged, 1):
+        yield [serial, bucket_label, *fields(item)]
+
 @app.route('/export_source_csv')
 def export_source_csv():
     """Export a loaded CPT source as CSV"""
@@ -2685,32 +4422,28 @@ def export_source_csv():
         return jsonify({'success': False, 'message': f'No CPT pricing loaded for {source_name}'}), 404
 
     cpt_data = analyzer.cpt_pricing[source_name]
-    output = StringIO()
-    writer = csv.writer(output)
-    writer.writerow(['S.No', 'CPT Code', 'Description', 'Negotiated Rate', 'Billing Class', 'Service Codes'])
-
-    serial = 1
-    for code in sorted(cpt_data.keys()):
-        info = cpt_data[code]
-        if info['rates']:
-            for rate in info['rates']:
-                writer.writerow([
-                    serial,
-                    code,
-                    info['description'],
-                    rate.get('negotiated_rate', ''),
-                    rate.get('billing_class', ''),
-                    ';'.join(rate.get('service_code', []))
-                ])
+
+    def rows():
+        yield ['S.No', 'CPT Code', 'Description', 'Negotiated Rate', 'Billing Class', 'Service Codes']
+        serial = 1
+        for code in analyzer.sorted_codes(source_name):
+            info = cpt_data[code]
+            if info['rates']:
+                for rate in info['rates']:
+                    yield [
+                        serial,
+                        code,
+                        info['description'],
+                        rate.get('negotiated_rate', ''),
+                        rate.get('billing_class', ''),
+                        ';'.join(rate.get('service_code') or ())
+                    ]
+                    serial += 1
+            else:
+                yield [serial, code, info['description'], '', '', '']
                 serial += 1
-        else:
-            writer.writerow([serial, code, info['description'], '', '', ''])
-            serial += 1
 
-    response = make_response(output.getvalue())
-    response.headers['Content-Disposition'] = f'attachment; filename="{source_name}_cpt_pricing.csv"'
-    response.headers['Content-Type'] = 'text/csv'
-    return response
+    return csv_stream_response(rows(), f'{source_name}_cpt_pricing.csv')
 
 @app.route('/export_comparison_csv')
 def export_comparison_csv():
@@ -2734,76 +4467,30 @@ def export_comparison_csv():
     if not comparison:
         return jsonify({'success': False, 'message': 'Comparison data not available. Please load CPT pricing for both sources first.'}), 404
 
-    output = StringIO()
-    writer = csv.writer(output)
-    writer.writerow(['Summary Metric', 'Value'])
-    writer.writerow(['Total Compared', comparison.get('total_compared', 0)])
-    writer.writerow([f'Higher in {source1} (count)', len(comparison.get('higher_in_source1', []))])
-    writer.writerow([f'Higher in {source1} (total)', comparison.get('total_higher_in_source1_amount', 0)])
-    writer.writerow([f'Lower in {source1} (count)', len(comparison.get('higher_in_source2', []))])
-    writer.writerow([f'Lower in {source1} (total)', comparison.get('total_higher_in_source2_amount', 0)])
-    writer.writerow([f'Higher in {source2} (count)', len(comparison.get('higher_in_source2', []))])
-    writer.writerow([f'Higher in {source2} (total)', comparison.get('total_higher_in_source2_amount', 0)])
-    writer.writerow([f'Lower in {source2} (count)', len(comparison.get('higher_in_source1', []))])
-    writer.writerow([f'Lower in {source2} (total)', comparison.get('total_higher_in_source1_amount', 0)])
-    writer.writerow(['Equal Pricing', len(comparison.get('equal', []))])
-    writer.writerow([])
-    writer.writerow(['S.No', 'Bucket', 'CPT Code', 'Source 1 Description', 'Source 2 Description', f'{source1} Rate', f'{source2} Rate', 'Difference (Source1-Source2)', 'Percent Difference'])
-
-    serial = 1
-
-    def write_rows(items, bucket_label):
-        nonlocal serial
-        for item in items:
-            writer.writerow([
-                serial,
-                bucket_label,
-                item.get('code', ''),
-                item.get('source1_description', item.get('description', '')),
-                item.get('source2_description', ''),
-                item.get('source1_rate', item.get('rate', '')),
-                item.get('source2_rate', ''),
-                item.get('difference', 0),
-                item.get('percent_difference', 0)
-            ])
-            serial += 1
-
-    write_rows(comparison.get('higher_in_source1', []), f'Higher in {source1}')
-    write_rows(comparison.get('higher_in_source2', []), f'Higher in {source2}')
-    write_rows(comparison.get('equal', []), 'Equal Pricing')
-
-    for item in comparison.get('only_in_source1', []):
-        writer.writerow([
-            serial,
-            f'Only in {source1}',
-            item.get('code', ''),
-            item.get('description', ''),
-            '',
-            item.get('rate', ''),
-            '',
-            '',
-            ''
-        ])
-        serial += 1
-
-    for item in comparison.get('only_in_source2', []):
-        writer.writerow([
-            serial,
-            f'Only in {source2}',
-            item.get('code', ''),
-            '',
-            item.get('description', ''),
-            '',
-            item.get('rate', ''),
-            '',
-            ''
-        ])
-        serial += 1
-
-    response = make_response(output.getvalue())
-    response.headers['Content-Disposition'] = f'attachment; filename="{source1}_vs_{source2}_comparison.csv"'
-    response.headers['Content-Type'] = 'text/csv'
-    return response
+    # Each source's "lower" rows mirror the other's "higher" rows, so two counts and totals cover all four.
+    higher1_count = len(comparison.get('higher_in_source1', []))
+    higher2_count = len(comparison.get('higher_in_source2', []))
+    higher1_total = comparison.get('total_higher_in_source1_amount', 0)
+    higher2_total = comparison.get('total_higher_in_source2_amount', 0)
+
+    def rows():
+        yield ['Summary Metric', 'Value']
+        yield ['Total Compared', comparison.get('total_compared', 0)]
+        yield [f'Higher in {source1} (count)', higher1_count]
+        yield [f'Higher in {source1} (total)', higher1_total]
+        yield [f'Lower in {source1} (count)', higher2_count]
+        yield [f'Lower in {source1} (total)', higher2_total]
+        yield [f'Higher in {source2} (count)', higher2_count]
+        yield [f'Higher in {source2} (total)', higher2_total]
+        yield [f'Lower in {source2} (count)', higher1_count]
+        yield [f'Lower in {source2} (total)', higher1_total]
+        yield ['Equal Pricing', len(comparison.get('equal', []))]
+        yield []
+        yield ['S.No', 'Bucket', 'CPT Code', 'Source 1 Description', 'Source 2 Description', f'{source1} Rate', f'{source2} Rate', 'Difference (Source1-Source2)', 'Percent Difference']
+
+        yield from _comparison_csv_rows(comparison, source1, source2, include_only=True)
+
+    return csv_stream_response(rows(), f'{source1}_vs_{source2}_comparison.csv')
 
 @app.route('/export_incremental_comparison_csv')
 def export_incremental_comparison_csv():
@@ -2819,58 +4506,35 @@ def export_incremental_comparison_csv():
         path = os.path.join(analyzer.comparison_session_dir, f'{session_id}.json')
         if not os.path.exists(path):
             return jsonify({'success': False, 'message': 'Session not found'}), 404
-        with open(path, 'r', encoding='utf-8') as f:
-            comparison = json.load(f)
+        with open(path, 'rb') as f:
+            comparison = json_loads(f.read())
 
     source1 = comparison.get('source1', 'Source 1')
     source2 = comparison.get('source2', 'Source 2')
 
-    output = StringIO()
-    writer = csv.writer(output)
-    writer.writerow(['Summary Metric', 'Value'])
-    writer.writerow(['Session ID', session_id])
-    writer.writerow(['Parts Processed', comparison.get('parts_processed', 0)])
-    writer.writerow(['Total Compared', comparison.get('total_compared', 0)])
-    writer.writerow(['Total Source1 Unique Codes', comparison.get('total_source1_count', 0)])
-    writer.writerow(['Total Source2 Codes', comparison.get('total_source2', 0)])
-    writer.writerow([f'Higher in {source1} (count)', comparison.get('higher_in_source1_count', len(comparison.get('higher_in_source1', [])))])
-    writer.writerow([f'Higher in {source1} (total)', comparison.get('total_higher_in_source1_amount', 0)])
-    writer.writerow([f'Lower in {source1} (count)', comparison.get('higher_in_source2_count', len(comparison.get('higher_in_source2', [])))])
-    writer.writerow([f'Lower in {source1} (total)', comparison.get('total_higher_in_source2_amount', 0)])
-    writer.writerow(['Equal Pricing (count)', comparison.get('equal_count', len(comparison.get('equal', [])))])
-    writer.writerow(['Only in Source 1 (count)', comparison.get('only_in_source1_count', 0)])
-    writer.writerow(['Only in Source 2 (count)', comparison.get('only_in_source2_count', 0)])
-    writer.writerow([])
-    writer.writerow(['Note', 'Detail rows are samples only (limited).'])
-    writer.writerow([])
-    writer.writerow(['S.No', 'Bucket', 'CPT Code', 'Source 1 Description', 'Source 2 Description', f'{source1} Rate', f'{source2} Rate', 'Difference (Source1-Source2)', 'Percent Difference'])
-
-    serial = 1
-
-    def write_rows(items, bucket_label):
-        nonlocal serial
-        for item in items:
-            writer.writerow([
-                serial,
-                bucket_label,
-                item.get('code', ''),
-                item.get('source1_description', item.get('description', '')),
-                item.get('source2_description', ''),
-                item.get('source1_rate', item.get('rate', '')),
-                item.get('source2_rate', ''),
-                item.get('difference', 0),
-                item.get('percent_difference', 0)
-            ])
-            serial += 1
-
-    write_rows(comparison.get('higher_in_source1', []), f'Higher in {source1}')
-    write_rows(comparison.get('higher_in_source2', []), f'Higher in {source2}')
-    write_rows(comparison.get('equal', []), 'Equal Pricing')
-
-    response = make_response(output.getvalue())
-    response.headers['Content-Disposition'] = f'attachment; filename=\"{source1}_vs_{source2}_incremental_{session_id}.csv\"'
-    response.headers['Content-Type'] = 'text/csv'
-    return response
+    def rows():
+        yield ['Summary Metric', 'Value']
+        yield ['Session ID', session_id]
+        yield ['Parts Processed', comparison.get('parts_processed', 0)]
+        yield ['Total Compared', comparison.get('total_compared', 0)]
+        yield ['Total Source1 Unique Codes', comparison.get('total_source1_count', 0)]
+        yield ['Total Source2 Codes', comparison.get('total_source2', 0)]
+        yield [f'Higher in {source1} (count)', comparison.get('higher_in_source1_count', len(comparison.get('higher_in_source1', [])))]
+        yield [f'Higher in {source1} (total)', comparison.get('total_higher_in_source1_amount', 0)]
+        yield [f'Lower in {source1} (count)', comparison.get('higher_in_source2_count', len(comparison.get('higher_in_source2', [])))]
+        yield [f'Lower in {source1} (total)', comparison.get('total_higher_in_source2_amount', 0)]
+        yield ['Equal Pricing (count)', comparison.get('equal_count', len(comparison.get('equal', [])))]
+        yield ['Only in Source 1 (count)', comparison.get('only_in_source1_count', 0)]
+        yield ['Only in Source 2 (count)', comparison.get('only_in_source2_count', 0)]
+        yield []
+        yield ['Note', 'Detail rows are samples only (limited).']
+        yield []
+        yield ['S.No', 'Bucket', 'CPT Code', 'Source 1 Description', 'Source 2 Description', f'{source1} Rate', f'{source2} Rate', 'Difference (Source1-Source2)', 'Percent Difference']
+        yield from _comparison_csv_rows(comparison, source1, source2)
+
+    return csv_stream_response(rows(), f'{source1}_vs_{source2}_incremental_{session_id}.csv')
 
 if __name__ == '__main__':
+    # The pure-Python backend is several times slower on large MRFs.
+    print(f"ijson backend: {ijson.backend}")
     app.run(debug=True, port=5001)
@@ -20,9 +20,10 @@ else:
 # Try to fetch
 print(f"\nFetching URL: {url[:100]}...")
 try:
-    response = requests.get(url, timeout=10)
-    print(f"Status Code: {response.status_code}")
-    print(f"Headers: {response.headers}")
-    print(f"Content (first 100 bytes): {response.content[:100]}")
+    # Stream so only the bytes printed are downloaded, not the whole multi-GB .json.gz.
+    with requests.get(url, stream=True, timeout=10) as response:
+        print(f"Status Code: {response.status_code}")
+        print(f"Headers: {response.headers}")
+        print(f"Content (first 100 bytes): {response.raw.read(100, decode_content=True)}")
 except Exception as e:
     print(f"Error fetching: {e}")
@@ -1,12 +1,18 @@
-import pandas as pd
+import openpyxl
 
 file_path = "/Volumes/Transcend/DEAN-new idea/130% of Mcare24 (3).xlsx"
 try:
-    df = pd.read_excel(file_path, sheet_name='Fee_Schedule_Extract_Query_Mult')
+    # Read-only mode streams rows, so only the header and preview rows are parsed.
+    wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    ws = wb['Fee_Schedule_Extract_Query_Mult']
+    rows = ws.iter_rows(max_row=6, values_only=True)
+    header = next(rows, ())
     print("Columns found:")
-    for col in df.columns:
+    for col in header:
         print(f"'{col}'")
     print("\nFirst few rows:")
-    print(df.head())
+    for row in rows:
+        print(row)
+    wb.close()
 except Exception as e:
     print(f"Error reading excel: {e}")
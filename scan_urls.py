@@ -1,24 +1,18 @@
-import json
+import ijson
 import urllib.parse
 import datetime
+from collections import Counter
 
 file_path = "/Volumes/Transcend/DEAN-new idea/2025-09-22_Blue-Cross-and-Blue-Shield-of-Illinois_index.json"
 
 try:
-    with open(file_path, 'r') as f:
-        data = json.load(f)
-
-    urls = []
-    if 'reporting_structure' in data:
-        for structure in data['reporting_structure']:
-            if 'in_network_files' in structure:
-                for file_info in structure['in_network_files']:
-                    if 'location' in file_info:
-                        urls.append(file_info['location'])
+    # Stream just the file locations; full indexes are too large to json.load comfortably.
+    with open(file_path, 'rb') as f:
+        urls = list(ijson.items(f, 'reporting_structure.item.in_network_files.item.location'))
 
     print(f"Found {len(urls)} URLs in the file.")
     
-    expiration_counts = {}
+    expiration_counts = Counter()
     valid_urls = []
     current_time = datetime.datetime.now().timestamp()
 
@@ -28,7 +22,7 @@ try:
         
         if 'Expires' in params:
             expires = int(params['Expires'][0])
-            expiration_counts[expires] = expiration_counts.get(expires, 0) + 1
+            expiration_counts[expires] += 1
             
             if expires > current_time:
                 valid_urls.append(url)
@@ -1,5 +1,4 @@
 from app import CPTPricingAnalyzer
-import pandas as pd
 import os
 
 def test_excel_loading():
@@ -24,7 +23,7 @@ def test_excel_loading():
             cpt_data = analyzer.cpt_pricing.get("Test Source", {})
             print(f"Loaded {len(cpt_data)} CPT codes.")
             # Print a sample
-            first_code = list(cpt_data.keys())[0]
+            first_code = next(iter(cpt_data))
             print(f"Sample Code: {first_code}")
             print(f"Sample Data: {cpt_data[first_code]}")
             